@@ -0,0 +1,135 @@
+# Description: Bulk validation of recorded Janggi games.  Replays each game's moves with make_move and reports
+# whether every move was legal, the first illegal ply and the final game state.  Results are streamed one per game,
+# in the order the games were given, and the work can be spread over a pool of processes.
+#
+# Usage: for result in validate_games(games, workers=8): ... where each game is a list of
+# (current space, move space) pairs as passed to JanggiGame.make_move
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from JanggiGame import JanggiGame, LegalMoveCache
+
+
+class GameValidation:
+    """
+    Result of replaying one recorded game
+    """
+
+    def __init__(self, index, first_illegal_ply, game_state, plies_played):
+        """
+        Initializes result of the game at position index in the input
+        first_illegal_ply is None when every move was legal
+        """
+        self._index = index
+        self._first_illegal_ply = first_illegal_ply
+        self._game_state = game_state
+        self._plies_played = plies_played
+
+    def get_index(self):
+        """
+        Returns position of the game in the games validated, starting at 0
+        """
+        return self._index
+
+    def is_legal(self):
+        """
+        Returns True if every move of the game was legal
+        """
+        return self._first_illegal_ply is None
+
+    def get_first_illegal_ply(self):
+        """
+        Returns index (starting at 0) of the first move make_move refused, None if every move was legal
+        """
+        return self._first_illegal_ply
+
+    def get_game_state(self):
+        """
+        Returns game state after the last legal move: UNFINISHED, RED_WON, BLUE_WON or DRAW
+        """
+        return self._game_state
+
+    def get_plies_played(self):
+        """
+        Returns number of moves played before the game ended or an illegal move was found
+        """
+        return self._plies_played
+
+
+def validate_game(moves, game=None):
+    """
+    Returns (first illegal ply or None, final game state, plies played) for one recorded game
+    Stops at the first move make_move refuses, a move naming a space that does not exist is illegal
+    game is reset and reused if given, which is quicker than making a new JanggiGame for every game
+    Inputs: List of (current space, move space) pairs, optional JanggiGame
+    Outputs: (first illegal ply, game state, plies played)
+    """
+    if game is None:
+        game = JanggiGame(LegalMoveCache(0))
+    else:
+        game.reset()
+    for ply, (current_space, move_space) in enumerate(moves):
+        try:
+            legal = game.make_move(current_space, move_space)
+        except KeyError:
+            legal = False
+        if not legal:
+            return ply, game.get_game_state(), ply
+    return None, game.get_game_state(), len(game.get_move_history())
+
+
+def _validate_chunk(games):
+    """
+    Validates a list of games in a worker process with one reused JanggiGame
+    Outputs: List of (first illegal ply, game state, plies played) in the same order
+    """
+    game = JanggiGame(LegalMoveCache(0))
+    return [validate_game(moves, game) for moves in games]
+
+
+def _get_chunks(games, chunk_size):
+    """
+    Yields lists of at most chunk_size games, reading games only as they are needed
+    """
+    chunk = []
+    for moves in games:
+        chunk.append(list(moves))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_games(games, workers=0, chunk_size=256):
+    """
+    Yields a GameValidation for every game, in the order given
+    Games are read as they are needed, so an archive does not have to fit in memory
+    With workers, chunks of chunk_size games are validated in that many processes, at most two chunks per
+    process are waiting at any time
+    Inputs: Iterable of games (each an iterable of (current space, move space) pairs), number of worker
+    processes (0 to validate in this process), games per chunk
+    Outputs: Generator of GameValidation
+    """
+    index = 0
+    if not workers:
+        game = JanggiGame(LegalMoveCache(0))
+        for moves in games:
+            first_illegal_ply, game_state, plies_played = validate_game(moves, game)
+            yield GameValidation(index, first_illegal_ply, game_state, plies_played)
+            index += 1
+        return
+
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        for chunk in _get_chunks(games, chunk_size):
+            pending.append(executor.submit(_validate_chunk, chunk))
+            while len(pending) >= 2 * workers or (pending and pending[0].done()):
+                for first_illegal_ply, game_state, plies_played in pending.popleft().result():
+                    yield GameValidation(index, first_illegal_ply, game_state, plies_played)
+                    index += 1
+        while pending:
+            for first_illegal_ply, game_state, plies_played in pending.popleft().result():
+                yield GameValidation(index, first_illegal_ply, game_state, plies_played)
+                index += 1
@@ -0,0 +1,136 @@
+# Description: Opening book for Janggi.  build_book replays game records and counts how often each move was played
+# from each position (and how often the side playing it went on to win), then writes the counts sorted by position
+# hash.  OpeningBook memory-maps the file and finds a position's moves by binary search, so the book is never read
+# into memory and every process using it shares the same pages.
+#
+# File: the 4 byte MAGIC, the number of entries (4 bytes), then fixed size entries sorted by position hash and move:
+# position hash (8 bytes), move from square | to square << 7 (2 bytes), times played (4 bytes), wins (4 bytes),
+# all little-endian.
+
+import mmap
+import random
+import struct
+
+from JanggiGame import JanggiGame, LegalMoveCache
+
+MAGIC = b"JGB\x01"
+_HEADER = struct.Struct("<4sI")
+_ENTRY = struct.Struct("<QHII")
+_HASH = struct.Struct("<Q")
+
+
+def build_book(records, path, max_plies=24, min_count=1):
+    """
+    Writes an opening book of the first max_plies moves of each game record to path
+    Games are replayed with make_move and stop counting at their first illegal move
+    Moves played fewer than min_count times are left out
+    Inputs: Iterable of GameRecord (see JanggiRecord), path of the book file, plies per game, least count
+    Outputs: Number of entries written
+    """
+    counts = {}
+    game = JanggiGame(LegalMoveCache(0))
+    for record in records:
+        game.reset()
+        result = record.get_result()
+        for current_space, move_space in record.get_moves()[:max_plies]:
+            position_hash = game.get_hash()
+            color = "blue" if game.get_last_turn() == "red" else "red"
+            if not game.make_move(current_space, move_space):
+                break
+            move = game.get_move_history()[-1] & 16383
+            if move & 127 == move >> 7:
+                # A pass may name any of the player's pieces, the book always names the General
+                general = game.get_position().get_general(0 if color == "red" else 1)
+                move = general | (general << 7)
+            key = (position_hash, move)
+            entry = counts.get(key)
+            if entry is None:
+                entry = counts[key] = [0, 0]
+            entry[0] += 1
+            if result == color.upper() + "_WON":
+                entry[1] += 1
+
+    entries = sorted((key, entry) for key, entry in counts.items() if entry[0] >= min_count)
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, len(entries)))
+        for (position_hash, move), (count, wins) in entries:
+            file.write(_ENTRY.pack(position_hash, move, min(count, 0xFFFFFFFF), min(wins, 0xFFFFFFFF)))
+    return len(entries)
+
+
+class OpeningBook:
+    """
+    Read-only opening book file, memory-mapped
+    Looks up a position's moves by binary search on the sorted position hashes
+    """
+
+    def __init__(self, path):
+        """
+        Opens the book file at path
+        """
+        with open(path, "rb") as file:
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._buffer) < _HEADER.size:
+            self._buffer.close()
+            raise ValueError("Not a Janggi opening book file")
+        magic, self._size = _HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or len(self._buffer) != _HEADER.size + self._size * _ENTRY.size:
+            self._buffer.close()
+            raise ValueError("Not a Janggi opening book file")
+
+    def get_size(self):
+        """
+        Returns number of (position, move) entries in the book
+        """
+        return self._size
+
+    def get_entries(self, position_hash):
+        """
+        Returns list of (move, times played, wins) for the position, most played first
+        Moves are packed as from square | to square << 7, an empty list means the position is not in the book
+        Inputs: Position hash (JanggiGame.get_hash)
+        Outputs: List of (packed move, count, wins)
+        """
+        buffer = self._buffer
+        low = 0
+        high = self._size
+        # First entry whose hash is not below position_hash
+        while low < high:
+            middle = (low + high) // 2
+            if _HASH.unpack_from(buffer, _HEADER.size + middle * _ENTRY.size)[0] < position_hash:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        while low < self._size:
+            entry_hash, move, count, wins = _ENTRY.unpack_from(buffer, _HEADER.size + low * _ENTRY.size)
+            if entry_hash != position_hash:
+                break
+            entries.append((move, count, wins))
+            low += 1
+        entries.sort(key=lambda entry: entry[1], reverse=True)
+        return entries
+
+    def choose_move(self, game, generator=random):
+        """
+        Returns book move for the side to move in game, picked at random weighted by times played
+        Only moves that are legal in game are picked, so a hash collision can not give an illegal move
+        Inputs: JanggiGame, optional random.Random for repeatable choices
+        Outputs: Packed move (with its captured piece, as from get_legal_moves) or None if out of book
+        """
+        legal_moves = {move & 16383: move for move in game.get_playable_moves()}
+        moves = []
+        weights = []
+        for move, count, wins in self.get_entries(game.get_hash()):
+            if move in legal_moves:
+                moves.append(legal_moves[move])
+                weights.append(count)
+        if not moves:
+            return None
+        return generator.choices(moves, weights)[0]
+
+    def close(self):
+        """
+        Closes the book file
+        """
+        self._buffer.close()
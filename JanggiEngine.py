@@ -0,0 +1,401 @@
+# Description: Search engine that chooses moves for a JanggiGame.  Iterative deepening alpha-beta (negamax) with a
+# transposition table, captures / killer moves / history ordering and a hard time limit.
+#
+# Usage: best_move(game, time_limit_ms, max_depth) returns a SearchResult, get_move_notation(result.get_move())
+# gives the spaces to pass to game.make_move
+
+import random
+import time
+
+from JanggiGame import COLOR_CODES, COLOR_NAMES, PIECE_VALUES, REPETITION_LIMIT
+from JanggiTablebase import WIN, LOSS
+
+MATE_SCORE = 100000
+# Scores above this are mates, stored in the transposition table relative to the position they were found in
+MATE_BOUND = MATE_SCORE - 1000
+MAX_DEPTH = 64
+
+# Transposition table entry kinds
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# How many nodes are searched between looks at the clock
+_CLOCK_INTERVAL = 255
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time limit runs out
+    """
+    pass
+
+
+class SearchResult:
+    """
+    Outcome of a search: best move, score, principal variation and how much work was done
+    """
+
+    def __init__(self, move, score, depth, principal_variation, nodes, seconds):
+        """
+        Initializes result of a search
+        move is None if the side to move has no legal move
+        """
+        self._move = move
+        self._score = score
+        self._depth = depth
+        self._principal_variation = principal_variation
+        self._nodes = nodes
+        self._seconds = seconds
+
+    def get_move(self):
+        """
+        Returns best packed move found (None if there is no legal move)
+        """
+        return self._move
+
+    def get_score(self):
+        """
+        Returns score of the best move for the side to move
+        Above MATE_BOUND the side to move mates, below -MATE_BOUND it is mated
+        """
+        return self._score
+
+    def get_depth(self):
+        """
+        Returns depth of the last search iteration that finished
+        """
+        return self._depth
+
+    def get_principal_variation(self):
+        """
+        Returns list of packed moves the search expects both sides to play, best move first
+        """
+        return list(self._principal_variation)
+
+    def get_nodes(self):
+        """
+        Returns number of positions searched
+        """
+        return self._nodes
+
+    def get_seconds(self):
+        """
+        Returns time taken by the search in seconds
+        """
+        return self._seconds
+
+
+class TranspositionTable:
+    """
+    Search results by position hash: (depth, score, entry kind, best move)
+    Emptied when it is full and a new position has to be stored
+    """
+
+    def __init__(self, max_size=1 << 18):
+        """
+        Initializes empty table holding at most max_size positions
+        """
+        self._entries = {}
+        self._max_size = max_size
+
+    def get(self, position_hash):
+        """
+        Returns (depth, score, entry kind, best move) stored for position_hash, or None
+        """
+        return self._entries.get(position_hash)
+
+    def store(self, position_hash, entry):
+        """
+        Stores (depth, score, entry kind, best move) for position_hash
+        """
+        entries = self._entries
+        if len(entries) >= self._max_size and position_hash not in entries:
+            entries.clear()
+        entries[position_hash] = entry
+
+    def clear(self):
+        """
+        Empties the table
+        """
+        self._entries.clear()
+
+    def get_size(self):
+        """
+        Returns number of positions stored
+        """
+        return len(self._entries)
+
+
+class JanggiEngine:
+    """
+    Alpha-beta search over JanggiGame positions
+    Keeps its transposition table between searches, so one engine can be reused for the moves of a game
+    Plays moves on the game with push and pop, the game is back in the same position when a search ends
+    """
+
+    def __init__(self, table_size=1 << 18, table=None, seed=None, tablebases=None):
+        """
+        Initializes engine with an empty transposition table holding at most table_size positions
+        table replaces the engine's own table with one that may be shared (anything with get, store and clear)
+        seed breaks ties in move ordering at random, so engines searching the same position side by side
+        look at moves in different orders
+        tablebases (a JanggiTablebase.TablebaseSet) gives exact scores to positions with few enough pieces
+        """
+        self._table = TranspositionTable(table_size) if table is None else table
+        self._tablebases = tablebases
+        self._tie_breaks = [0.0] * 16384
+        if seed is not None:
+            generator = random.Random(seed)
+            self._tie_breaks = [generator.random() for _ in range(16384)]
+        self._root_moves = None
+        self._iterations = []
+        self._killers = [[0, 0] for _ in range(MAX_DEPTH + 1)]
+        self._history = {}
+        self._pv = [[] for _ in range(MAX_DEPTH + 2)]
+        self._nodes = 0
+        self._deadline = 0.0
+
+    def clear(self):
+        """
+        Empties the transposition table and move ordering statistics
+        """
+        self._table.clear()
+        self._history.clear()
+        self._killers = [[0, 0] for _ in range(MAX_DEPTH + 1)]
+
+    def search(self, game, time_limit_ms=1000, max_depth=MAX_DEPTH, root_moves=None):
+        """
+        Returns best move for the side to move found within the time limit
+        Searches depth 1, 2, ... up to max_depth and stops when time runs out,
+        the result is that of the deepest iteration that finished
+        root_moves limits the search to some of the legal moves, for splitting a search between processes
+        Inputs: JanggiGame, time limit in milliseconds, maximum depth in plies, optional list of packed moves
+        Outputs: SearchResult
+        """
+        start = time.perf_counter()
+        self._deadline = start + time_limit_ms / 1000.0
+        self._nodes = 0
+        self._killers = [[0, 0] for _ in range(MAX_DEPTH + 1)]
+        max_depth = max(1, min(max_depth, MAX_DEPTH))
+        color_num = 1 - COLOR_CODES[game.get_last_turn()]
+
+        legal_moves = game.get_playable_moves()
+        if root_moves is not None:
+            root_moves = [move for move in legal_moves if move in root_moves]
+        else:
+            root_moves = legal_moves
+        self._root_moves = root_moves if len(root_moves) < len(legal_moves) else None
+        self._iterations = []
+        if game.get_game_state() != "UNFINISHED" or not root_moves:
+            return SearchResult(None, -MATE_SCORE if not root_moves else 0, 0, [], 0,
+                                time.perf_counter() - start)
+
+        result = SearchResult(root_moves[0], 0, 0, [root_moves[0]], 0, 0.0)
+        undo_depth = len(game.get_move_history())
+        for depth in range(1, max_depth + 1):
+            try:
+                score = self._negamax(game, depth, -MATE_SCORE - 1, MATE_SCORE + 1, 0)
+            except SearchTimeout:
+                while len(game.get_move_history()) > undo_depth:
+                    game.pop()
+                break
+            principal_variation = list(self._pv[0])
+            result = SearchResult(principal_variation[0], score, depth, principal_variation, self._nodes,
+                                  time.perf_counter() - start)
+            self._iterations.append(result)
+            # A found mate can not get any shorter, and the next iteration would rarely finish in what is left
+            if abs(score) > MATE_BOUND or time.perf_counter() - start > (self._deadline - start) / 2:
+                break
+        return SearchResult(result.get_move(), result.get_score(), result.get_depth(),
+                            result.get_principal_variation(), self._nodes, time.perf_counter() - start)
+
+    def get_iterations(self):
+        """
+        Returns list of SearchResult of every iteration the last search finished, shallowest first
+        """
+        return list(self._iterations)
+
+    def _order_moves(self, moves, position, table_move, ply):
+        """
+        Returns moves sorted best first for searching
+        1. The transposition table's best move
+        2. Captures, most valuable victim first and cheapest attacker among equals
+        3. The two killer moves of this ply (quiet moves that caused a cutoff in a sibling position)
+        4. Other moves by history score (how often they caused cutoffs anywhere in the search)
+        """
+        killers = self._killers[ply]
+        history = self._history
+        tie_breaks = self._tie_breaks
+        scores = {}
+        for move in moves:
+            captured = move >> 14
+            if move == table_move:
+                scores[move] = 1 << 40
+            elif captured:
+                scores[move] = (1 << 30) + PIECE_VALUES[captured & 7] * 16 - \
+                    PIECE_VALUES[position.get_code(move & 127) & 7] // 100
+            elif move == killers[0]:
+                scores[move] = (1 << 29) + 1
+            elif move == killers[1]:
+                scores[move] = 1 << 29
+            else:
+                scores[move] = history.get(move & 16383, 0) + tie_breaks[move & 16383]
+        return sorted(moves, key=scores.__getitem__, reverse=True)
+
+    def _negamax(self, game, depth, alpha, beta, ply):
+        """
+        Returns score of the position for the side to move, searched depth plies deep
+        Fills self._pv[ply] with the best line found from this position
+        Raises SearchTimeout when the time limit runs out
+        """
+        self._nodes += 1
+        if not self._nodes & _CLOCK_INTERVAL and time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+        self._pv[ply] = []
+        position = game.get_position()
+        color_num = 1 - COLOR_CODES[game.get_last_turn()]
+        opponent = 1 - color_num
+
+        position_hash = game.get_hash()
+        entry = self._table.get(position_hash)
+        table_move = 0
+        if entry is not None:
+            entry_depth, entry_score, entry_kind, table_move = entry
+            if ply and entry_depth >= depth:
+                if entry_score > MATE_BOUND:
+                    entry_score -= ply
+                elif entry_score < -MATE_BOUND:
+                    entry_score += ply
+                if entry_kind == EXACT or (entry_kind == LOWER and entry_score >= beta) or \
+                        (entry_kind == UPPER and entry_score <= alpha):
+                    if table_move:
+                        self._pv[ply] = [table_move]
+                    return entry_score
+
+        if ply and self._tablebases is not None:
+            result = self._tablebases.probe_board(position, color_num)
+            if result is not None:
+                outcome, distance = result
+                if outcome == WIN:
+                    return MATE_SCORE - ply - distance
+                return -MATE_SCORE + ply + distance if outcome == LOSS else 0
+
+        if depth <= 0 or ply >= MAX_DEPTH:
+            return self._quiescence(game, alpha, beta, ply)
+
+        restricted = ply == 0 and self._root_moves is not None
+        legal_moves = self._root_moves if restricted else game.get_playable_moves()
+        # Passing is searched last, it is only best when every real move makes things worse
+        moves = self._order_moves([move for move in legal_moves if move & 127 != (move >> 7) & 127],
+                                  position, table_move, ply)
+        moves.extend(move for move in legal_moves if move & 127 == (move >> 7) & 127)
+        generals_facing = position.generals_facing()
+
+        original_alpha = alpha
+        best_score = -MATE_SCORE - 1
+        best_move = 0
+        for move in moves:
+            game.push(move)
+            if (generals_facing and position.generals_facing()) or \
+                    game.get_repetition_count() >= REPETITION_LIMIT:
+                # Drawn by bikjang or repetition (see JanggiGame.update_state), unless the move mates
+                score = MATE_SCORE - ply - 1 if game.is_checkmated(COLOR_NAMES[opponent]) else 0
+                self._pv[ply + 1] = []
+            else:
+                score = -self._negamax(game, depth - 1, -beta, -alpha, ply + 1)
+            game.pop()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    self._pv[ply] = [move] + self._pv[ply + 1]
+                    if score >= beta:
+                        if not move >> 14:
+                            killers = self._killers[ply]
+                            if killers[0] != move:
+                                killers[1] = killers[0]
+                                killers[0] = move
+                            key = move & 16383
+                            self._history[key] = self._history.get(key, 0) + depth * depth
+                        break
+
+        if best_move == 0:
+            # No legal move while in check
+            return -MATE_SCORE + ply
+
+        if best_score <= original_alpha:
+            kind = UPPER
+        elif best_score >= beta:
+            kind = LOWER
+        else:
+            kind = EXACT
+        stored_score = best_score
+        if stored_score > MATE_BOUND:
+            stored_score += ply
+        elif stored_score < -MATE_BOUND:
+            stored_score -= ply
+        # The best of some root moves says nothing certain about the position
+        if not restricted:
+            self._table.store(position_hash, (depth, stored_score, kind, best_move))
+        return best_score
+
+    def _quiescence(self, game, alpha, beta, ply):
+        """
+        Returns score of the position for the side to move once no captures are left to play
+        Only captures are searched, so a depth limit in the middle of an exchange does not misjudge it
+        The side to move may stand pat on the static evaluation instead of capturing,
+        except in check, where every evasion is searched and no evasion is mate
+        Raises SearchTimeout when the time limit runs out
+        """
+        self._nodes += 1
+        if not self._nodes & _CLOCK_INTERVAL and time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+        self._pv[ply] = []
+        position = game.get_position()
+        color_num = 1 - COLOR_CODES[game.get_last_turn()]
+        opponent = 1 - color_num
+        if ply >= MAX_DEPTH:
+            return position.evaluate(color_num)
+
+        if position.is_attacked(position.get_general(color_num), opponent):
+            best_score = -MATE_SCORE + ply
+            moves = position.generate_moves(color_num)
+        else:
+            best_score = position.evaluate(color_num)
+            if best_score >= beta:
+                return best_score
+            if best_score > alpha:
+                alpha = best_score
+            moves = [move for move in position.generate_moves(color_num) if move >> 14]
+        moves.sort(key=lambda move: PIECE_VALUES[(move >> 14) & 7] * 16 -
+                   PIECE_VALUES[position.get_code(move & 127) & 7] // 100, reverse=True)
+
+        for move in moves:
+            game.push(move)
+            if position.is_attacked(position.get_general(color_num), opponent):
+                game.pop()
+                continue
+            score = -self._quiescence(game, -beta, -alpha, ply + 1)
+            game.pop()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    self._pv[ply] = [move] + self._pv[ply + 1]
+                    if score >= beta:
+                        break
+        return best_score
+
+
+def best_move(game, time_limit_ms=1000, max_depth=MAX_DEPTH, engine=None):
+    """
+    Returns best move for the side to move in game, searched for at most time_limit_ms milliseconds
+    Pass the same JanggiEngine for every move of a game to keep its transposition table
+    Inputs: JanggiGame, time limit in milliseconds, maximum depth in plies, optional JanggiEngine
+    Outputs: SearchResult with the move, score, principal variation and nodes searched
+    """
+    if engine is None:
+        engine = JanggiEngine()
+    return engine.search(game, time_limit_ms, max_depth)
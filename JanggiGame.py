@@ -3,6 +3,11 @@
 # Description: Portfolio Project - Program that can be used to play a game of Janggi.  Abides by all piece moves,
 # keeps track of game status, and identifies when and who has won the game
 
+import random
+import sys
+from collections import OrderedDict
+
+
 def get_num_to_letter(number):
     """
     Returns letter equivalent of number for columns
@@ -40,6 +45,1014 @@ def get_letter_to_num(letter):
     }
     return letter_to_num[letter]
 
+
+# Colors and piece types used by the compact Board
+# A piece code is its type with the color in bit 3 (0 = empty square)
+RED = 0
+BLUE = 1
+GENERAL = 1
+GUARD = 2
+ELEPHANT = 3
+HORSE = 4
+CHARIOT = 5
+CANNON = 6
+SOLDIER = 7
+
+COLOR_NAMES = ("red", "blue")
+TYPE_NAMES = ("", "General", "Guard", "Elephant", "Horse", "Chariot", "Cannon", "Soldier")
+COLOR_CODES = {"red": RED, "blue": BLUE}
+TYPE_CODES = {"General": GENERAL, "Guard": GUARD, "Elephant": ELEPHANT, "Horse": HORSE,
+              "Chariot": CHARIOT, "Cannon": CANNON, "Soldier": SOLDIER}
+
+
+def get_piece_code(color, kind):
+    """
+    Returns the small integer code for a piece of color and type
+    Inputs: Color number (RED or BLUE) and type number (GENERAL ... SOLDIER)
+    Outputs: Piece code stored on the Board
+    """
+    return kind | (color << 3)
+
+
+def get_square(column, row):
+    """
+    Returns the Board square number (0-89) of a column and row
+    """
+    return row * 9 + column
+
+
+# Game-play space of every Board square, and the reverse
+SPACE_NAMES = tuple(get_num_to_letter(square % 9) + str(square // 9 + 1) for square in range(90))
+SPACE_SQUARES = {space: square for square, space in enumerate(SPACE_NAMES)}
+
+
+def get_space_name(column, row):
+    """
+    Returns game-play space ("a1" .. "i10") of a column and row number
+    """
+    return SPACE_NAMES[row * 9 + column]
+
+
+def get_space_square(space):
+    """
+    Returns Board square number of a game-play space ("a1" .. "i10")
+    """
+    return SPACE_SQUARES[space]
+
+
+# Moves are packed into one integer: from square, to square and the captured piece code
+# A move whose from and to square are the same is a pass
+def encode_move(from_square, to_square, captured=0):
+    """
+    Returns packed integer move
+    Inputs: From square, to square and code of the captured piece (0 if none)
+    Outputs: from_square | to_square << 7 | captured << 14
+    """
+    return from_square | (to_square << 7) | (captured << 14)
+
+
+def get_move_from(move):
+    """
+    Returns from square of a packed move
+    """
+    return move & 127
+
+
+def get_move_to(move):
+    """
+    Returns to square of a packed move
+    """
+    return (move >> 7) & 127
+
+
+def get_move_captured(move):
+    """
+    Returns code of the piece captured by a packed move (0 if none)
+    """
+    return move >> 14
+
+
+def get_move_notation(move):
+    """
+    Returns game-play spaces of a packed move, as passed to JanggiGame.make_move
+    Outputs: (current space, move space) e.g. ("c1", "d3")
+    """
+    return SPACE_NAMES[move & 127], SPACE_NAMES[(move >> 7) & 127]
+
+
+def in_palace(column, row):
+    """
+    Returns True if the column and row is inside either fortress
+    """
+    return 3 <= column <= 5 and (0 <= row <= 2 or 7 <= row <= 9)
+
+
+def _build_palace_rays():
+    """
+    Returns the diagonal lines of both fortresses for every square
+    Corners reach the center and then the opposite corner, the center reaches each corner
+    Outputs: List of 90 tuples of rays (each ray is a tuple of squares), empty off the diagonals
+    """
+    palace_rays = [()] * 90
+    for center_row in (1, 8):
+        center = get_square(4, center_row)
+        corners = [(3, center_row - 1), (5, center_row - 1), (3, center_row + 1), (5, center_row + 1)]
+        palace_rays[center] = tuple((get_square(column, row),) for column, row in corners)
+        for column, row in corners:
+            palace_rays[get_square(column, row)] = ((center, get_square(8 - column, 2 * center_row - row)),)
+    return palace_rays
+
+
+def _build_move_tables():
+    """
+    Returns lookup tables of the one-step and jumping moves for each of the 90 squares
+    1. Horse: (space passed over, destination) pairs
+    2. Elephant: (first space passed over, second space passed over, destination)
+    3. Fortress: spaces one step away along the fortress lines (General and Guard moves)
+    4. Soldier: destinations for each color, forward, sideways and forward fortress diagonals
+    Outputs: (horse table, elephant table, fortress table, soldier tables by color)
+    """
+    horse_moves = []
+    elephant_moves = []
+    palace_moves = []
+    soldier_moves = [[], []]
+    for square in range(90):
+        column = square % 9
+        row = square // 9
+        horse = []
+        elephant = []
+        for step_column, step_row in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            for side in (1, -1):
+                diagonal_column = step_column if step_column else side
+                diagonal_row = step_row if step_row else side
+                end_column = column + step_column + diagonal_column
+                end_row = row + step_row + diagonal_row
+                if 0 <= end_column <= 8 and 0 <= end_row <= 9:
+                    horse.append((get_square(column + step_column, row + step_row), get_square(end_column, end_row)))
+                if 0 <= end_column + diagonal_column <= 8 and 0 <= end_row + diagonal_row <= 9:
+                    elephant.append((get_square(column + step_column, row + step_row),
+                                     get_square(end_column, end_row),
+                                     get_square(end_column + diagonal_column, end_row + diagonal_row)))
+        horse_moves.append(tuple(horse))
+        elephant_moves.append(tuple(elephant))
+
+        palace = []
+        if in_palace(column, row):
+            for end_column, end_row in ((column + 1, row), (column - 1, row), (column, row + 1), (column, row - 1)):
+                if in_palace(end_column, end_row):
+                    palace.append(get_square(end_column, end_row))
+            palace.extend(ray[0] for ray in _PALACE_RAYS[square])
+        palace_moves.append(tuple(palace))
+
+        for color, forward in ((RED, 1), (BLUE, -1)):
+            soldier = [get_square(end_column, end_row)
+                       for end_column, end_row in ((column + 1, row), (column - 1, row), (column, row + forward))
+                       if 0 <= end_column <= 8 and 0 <= end_row <= 9]
+            soldier.extend(ray[0] for ray in _PALACE_RAYS[square] if ray[0] // 9 == row + forward)
+            soldier_moves[color].append(tuple(soldier))
+    return horse_moves, elephant_moves, palace_moves, soldier_moves
+
+
+def _build_orthogonal_rays():
+    """
+    Returns ray table for Chariot and Cannon moves
+    For each square, the spaces to the right, left, up (row - 1) and down (row + 1), nearest first
+    Outputs: List of 90 (right, left, up, down) rays
+    """
+    orthogonal_rays = []
+    for square in range(90):
+        column = square % 9
+        orthogonal_rays.append((tuple(range(square + 1, square + 9 - column)),
+                                tuple(range(square - 1, square - column - 1, -1)),
+                                tuple(range(square - 9, -1, -9)),
+                                tuple(range(square + 9, 90, 9))))
+    return orthogonal_rays
+
+
+def _build_slide_runs():
+    """
+    Returns run-length tables for Chariot and Cannon moves
+    For each of the right, left, up and down directions, indexed by position on the line and occupancy of the line
+    (one bit per space, as kept in Board rank and file masks), the number of empty spaces before the first piece
+    Outputs: (right, left, up, down) run tables
+    """
+    def runs(length, step):
+        table = []
+        for position in range(length):
+            if step > 0:
+                # Empty spaces above position: the lowest set bit above it, or the end of the line
+                free = length - position - 1
+                table.append([((occupancy >> (position + 1)) & -(occupancy >> (position + 1))).bit_length() - 1
+                              if occupancy >> (position + 1) else free for occupancy in range(1 << length)])
+            else:
+                # Empty spaces below position: the highest set bit below it, or the start of the line
+                mask = (1 << position) - 1
+                table.append([position - (occupancy & mask).bit_length() for occupancy in range(1 << length)])
+        return table
+
+    return runs(9, 1), runs(9, -1), runs(10, -1), runs(10, 1)
+
+
+def _load_slide_runs():
+    """
+    Builds the Chariot and Cannon run tables the first time a Board needs them
+    Keeps importing the module cheap for processes that never make a Board
+    """
+    global _SLIDE_RUNS
+    if _SLIDE_RUNS is None:
+        _SLIDE_RUNS = _build_slide_runs()
+
+
+_PALACE_RAYS = _build_palace_rays()
+HORSE_MOVES, ELEPHANT_MOVES, PALACE_MOVES, SOLDIER_MOVES = _build_move_tables()
+ORTHOGONAL_RAYS = _build_orthogonal_rays()
+# Built by _load_slide_runs when the first Board is made
+_SLIDE_RUNS = None
+# Spaces a Horse or Elephant on each square can be blocked by
+_HORSE_PASSED = [tuple(sorted({passed for passed, _ in moves})) for moves in HORSE_MOVES]
+_ELEPHANT_PASSED = [tuple(sorted({passed for move in moves for passed in move[:2]})) for moves in ELEPHANT_MOVES]
+
+
+def _build_zobrist_keys():
+    """
+    Returns random 64-bit keys for every piece code on every square and for the side to move
+    Uses a fixed seed so hashes are the same in every process and every run
+    Outputs: (list of 16 lists of 90 keys, side to move key), code 0 (empty) keys are all 0
+    """
+    generator = random.Random(0x4A414E474749)
+    piece_keys = [[0] * 90]
+    for _ in range(1, 16):
+        piece_keys.append([generator.getrandbits(64) for _ in range(90)])
+    return piece_keys, generator.getrandbits(64)
+
+
+_ZOBRIST, _ZOBRIST_RED_TO_MOVE = _build_zobrist_keys()
+
+# Evaluation: piece values by type (none, General, Guard, Elephant, Horse, Chariot, Cannon, Soldier)
+# and a positional bonus for each type on each square, given for red and mirrored for blue
+PIECE_VALUES = (0, 0, 300, 300, 500, 1300, 700, 200)
+
+
+def _get_square_bonus(kind, column, row):
+    """
+    Returns positional bonus of a red piece of type kind on column and row (row 0 is red's back rank)
+    1. General and Guard: center and back of the fortress
+    2. Elephant and Horse: toward the middle of the board
+    3. Chariot: open central files and the opponent's side
+    4. Cannon: central files and own fortress, where it screens the General
+    5. Soldier: more the further it has advanced, most in the opponent's fortress
+    """
+    center_distance = abs(column - 4)
+    if kind == GENERAL:
+        return 20 if (column, row) == (4, 1) else 5 if row == 0 else 0
+    if kind == GUARD:
+        return 10 if row <= 1 and center_distance <= 1 else 0
+    if kind == ELEPHANT:
+        return 10 - 3 * center_distance - 2 * abs(row - 3)
+    if kind == HORSE:
+        return 24 - 4 * center_distance - 3 * abs(row - 4)
+    if kind == CHARIOT:
+        return 10 - 2 * center_distance + (10 if row >= 5 else 0)
+    if kind == CANNON:
+        return 10 - 2 * center_distance + (10 if row <= 2 and center_distance <= 1 else 0)
+    if kind == SOLDIER:
+        advance = max(0, row - 3)
+        bonus = 8 * advance + (2 * advance if center_distance <= 1 else 0)
+        return bonus - 15 if row == 9 else bonus
+    return 0
+
+
+def _build_piece_square_values():
+    """
+    Returns value of every piece code on every square, piece value plus positional bonus
+    Outputs: List of 16 lists of 90 values, code 0 (empty) values are all 0
+    """
+    values = [[0] * 90 for _ in range(16)]
+    for kind in range(GENERAL, SOLDIER + 1):
+        for square in range(90):
+            column = square % 9
+            row = square // 9
+            values[get_piece_code(RED, kind)][square] = PIECE_VALUES[kind] + _get_square_bonus(kind, column, row)
+            values[get_piece_code(BLUE, kind)][square] = PIECE_VALUES[kind] + _get_square_bonus(kind, column, 9 - row)
+    return values
+
+
+_PIECE_SQUARE_VALUES = _build_piece_square_values()
+
+
+class Board:
+    """
+    Compact position used internally by JanggiGame
+    1. One byte per square (90 squares, row by row) holding a piece code or 0
+    2. Occupancy masks per color, per rank and per file
+    3. Square of each General
+    4. Attack map: how many pieces of each color attack every square
+    5. Evaluation: total piece value plus positional bonus of each color
+    The attack map is kept up to date as pieces move, so finding out whether a
+    square is attacked is a single lookup
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty board
+        """
+        if _SLIDE_RUNS is None:
+            _load_slide_runs()
+        self._squares = bytearray(90)
+        self._color_occ = [0, 0]
+        self._rank_occ = [0] * 10
+        self._file_occ = [0] * 9
+        self._generals = [-1, -1]
+        # Squares attacked by the piece on each square and the squares those attacks depend on
+        # (spaces a piece slides or jumps over, screens and cannon targets)
+        self._attacks = [()] * 90
+        self._depends = [()] * 90
+        # Squares of the pieces whose attacks depend on each square, one bit per square
+        self._watchers = [0] * 90
+        # Number of pieces of each color attacking each square, one byte per square
+        self._attack_counts = [bytearray(90), bytearray(90)]
+        # Number of boards sharing the attack map, one list shared by all of them (see copy)
+        self._attack_map_owners = [1]
+        self._scores = [0, 0]
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Returns a Board built from a list of 10 rows holding Pieces objects or ""
+        Inputs: Nested board as returned by JanggiGame.get_board
+        Outputs: Board with the same pieces
+        """
+        board = cls()
+        for row, items in enumerate(rows):
+            for column, item in enumerate(items):
+                if item != "":
+                    board.put(get_square(column, row),
+                              get_piece_code(COLOR_CODES[item.get_color()], TYPE_CODES[item.get_type()]))
+        return board
+
+    def get_code(self, square):
+        """
+        Returns piece code on square (0 if empty)
+        """
+        return self._squares[square]
+
+    def copy(self):
+        """
+        Returns a new Board with the same pieces, attack map and evaluation
+        Quicker than placing the pieces on an empty board again
+        The attack map is shared until one of the boards changes, that board then copies it (copy on write)
+        A board whose copies have all been dropped owns its attack map again and changes it without copying
+        """
+        board = Board.__new__(Board)
+        board._squares = bytearray(self._squares)
+        board._color_occ = list(self._color_occ)
+        board._rank_occ = list(self._rank_occ)
+        board._file_occ = list(self._file_occ)
+        board._generals = list(self._generals)
+        board._attacks = self._attacks
+        board._depends = self._depends
+        board._watchers = self._watchers
+        board._attack_counts = self._attack_counts
+        board._scores = list(self._scores)
+        owners = self._attack_map_owners
+        owners[0] += 1
+        board._attack_map_owners = owners
+        return board
+
+    def __del__(self):
+        """
+        Gives up the board's share of its attack map
+        """
+        self._attack_map_owners[0] -= 1
+
+    def _copy_attack_map(self):
+        """
+        Gives the board its own copy of an attack map shared by copy, before the board changes it
+        Only the lists indexed by square are copied, the attacks and depends stored in them are replaced and
+        never changed in place, so they stay shared
+        """
+        self._attack_map_owners[0] -= 1
+        self._attack_map_owners = [1]
+        self._attacks = list(self._attacks)
+        self._depends = list(self._depends)
+        self._watchers = list(self._watchers)
+        self._attack_counts = [bytearray(self._attack_counts[0]), bytearray(self._attack_counts[1])]
+
+    def get_codes(self):
+        """
+        Returns copy of the piece codes of all 90 squares, row by row
+        """
+        return bytes(self._squares)
+
+    def get_general(self, color):
+        """
+        Returns square of the General of color (-1 if it is not on the board)
+        """
+        return self._generals[color]
+
+    def get_attack_count(self, square, color):
+        """
+        Returns number of pieces of color attacking square
+        A piece attacks the squares it could capture on, including squares held by its own color
+        """
+        return self._attack_counts[color][square]
+
+    def evaluate(self, color):
+        """
+        Returns static evaluation of the position from the point of view of color
+        Piece values plus positional bonuses of color minus those of the opponent, kept up to date
+        as pieces are placed, moved and captured
+        Inputs: Color number (RED or BLUE)
+        Outputs: Score, positive when color is ahead
+        """
+        return self._scores[color] - self._scores[1 - color]
+
+    def put(self, square, code):
+        """
+        Places piece code on an empty square
+        Updates occupancy masks and the attack map
+        """
+        if self._attack_map_owners[0] > 1:
+            self._copy_attack_map()
+        self._occupy(square, code)
+        self._refresh_watchers(self._watchers[square])
+        self._add_attacks(square)
+
+    def remove(self, square):
+        """
+        Removes the piece on square
+        Updates occupancy masks and the attack map
+        Outputs: Code of the removed piece
+        """
+        if self._attack_map_owners[0] > 1:
+            self._copy_attack_map()
+        code = self._squares[square]
+        self._drop_attacks(square)
+        self._vacate(square, code)
+        self._refresh_watchers(self._watchers[square])
+        return code
+
+    def move(self, from_square, to_square):
+        """
+        Moves piece between squares, capturing whatever is on the destination
+        Only the pieces whose attacks pass over either square have their attacks recalculated
+        Outputs: Code of the captured piece (0 if none)
+        """
+        if self._attack_map_owners[0] > 1:
+            self._copy_attack_map()
+        squares = self._squares
+        code = squares[from_square]
+        captured = squares[to_square]
+        self._drop_attacks(from_square)
+        self._vacate(from_square, code)
+        if captured:
+            self._drop_attacks(to_square)
+            self._vacate(to_square, captured)
+        self._occupy(to_square, code)
+        self._refresh_watchers(self._watchers[from_square] | self._watchers[to_square])
+        self._add_attacks(to_square)
+        return captured
+
+    def undo_move(self, from_square, to_square, captured):
+        """
+        Takes back a move made with move, putting the captured piece back on the destination
+        Inputs: From square and to square of the move, code of the captured piece (0 if none)
+        """
+        if self._attack_map_owners[0] > 1:
+            self._copy_attack_map()
+        code = self._squares[to_square]
+        self._drop_attacks(to_square)
+        self._vacate(to_square, code)
+        self._occupy(from_square, code)
+        if captured:
+            self._occupy(to_square, captured)
+        self._refresh_watchers(self._watchers[from_square] | self._watchers[to_square])
+        self._add_attacks(from_square)
+        if captured:
+            self._add_attacks(to_square)
+
+    def _occupy(self, square, code):
+        """
+        Sets square to piece code and updates occupancy masks
+        """
+        column = square % 9
+        row = square // 9
+        self._squares[square] = code
+        self._color_occ[code >> 3] |= 1 << square
+        self._rank_occ[row] |= 1 << column
+        self._file_occ[column] |= 1 << row
+        self._scores[code >> 3] += _PIECE_SQUARE_VALUES[code][square]
+        if code & 7 == GENERAL:
+            self._generals[code >> 3] = square
+
+    def _vacate(self, square, code):
+        """
+        Empties square holding piece code and updates occupancy masks
+        """
+        column = square % 9
+        row = square // 9
+        self._squares[square] = 0
+        self._color_occ[code >> 3] &= ~(1 << square)
+        self._rank_occ[row] &= ~(1 << column)
+        self._file_occ[column] &= ~(1 << row)
+        self._scores[code >> 3] -= _PIECE_SQUARE_VALUES[code][square]
+        if code & 7 == GENERAL:
+            self._generals[code >> 3] = -1
+
+    def _add_attacks(self, square):
+        """
+        Calculates attacks of the piece on square and adds them to the attack map
+        """
+        attacks, depends = self._calculate_attacks(square)
+        counts = self._attack_counts[self._squares[square] >> 3]
+        for target in attacks:
+            counts[target] += 1
+        watchers = self._watchers
+        bit = 1 << square
+        for depend in depends:
+            watchers[depend] |= bit
+        self._attacks[square] = attacks
+        self._depends[square] = depends
+
+    def _drop_attacks(self, square):
+        """
+        Takes the stored attacks of the piece on square back out of the attack map
+        """
+        counts = self._attack_counts[self._squares[square] >> 3]
+        for target in self._attacks[square]:
+            counts[target] -= 1
+        # Each square is listed once in depends, so its watcher bit is set and flipping it clears it
+        watchers = self._watchers
+        bit = 1 << square
+        for depend in self._depends[square]:
+            watchers[depend] ^= bit
+        self._attacks[square] = ()
+        self._depends[square] = ()
+
+    def _refresh_attacks(self, square):
+        """
+        Recalculates attacks of the piece on square after a square it depends on changed
+        """
+        self._drop_attacks(square)
+        self._add_attacks(square)
+
+    def _refresh_watchers(self, watchers):
+        """
+        Recalculates attacks of every piece in a watcher mask (one bit per square)
+        """
+        drop_attacks = self._drop_attacks
+        add_attacks = self._add_attacks
+        while watchers:
+            lowest = watchers & -watchers
+            square = lowest.bit_length() - 1
+            drop_attacks(square)
+            add_attacks(square)
+            watchers ^= lowest
+
+    def get_attackers(self, square, by_color):
+        """
+        Returns list of squares of the pieces of by_color attacking square
+        """
+        attacks = self._attacks
+        return [piece_square for piece_square in self.get_squares(by_color) if square in attacks[piece_square]]
+
+    def get_block_squares(self, attacker, target):
+        """
+        Returns the squares the attack of the piece on attacker against target depends on
+        The attacker's own square, the spaces between a Chariot or Cannon and target (including a
+        Cannon's screen) and the spaces a Horse or Elephant passes over
+        A move that neither leaves nor lands on one of these squares can not stop the attack
+        Inputs: Square of the attacking piece and the attacked square
+        Outputs: Tuple of squares
+        """
+        kind = self._squares[attacker] & 7
+        if kind == CHARIOT or kind == CANNON:
+            for ray in ORTHOGONAL_RAYS[attacker] + _PALACE_RAYS[attacker]:
+                if target in ray:
+                    return ray[:ray.index(target)] + (attacker,)
+        if kind == HORSE:
+            for passed, end in HORSE_MOVES[attacker]:
+                if end == target:
+                    return passed, attacker
+        if kind == ELEPHANT:
+            for first, second, end in ELEPHANT_MOVES[attacker]:
+                if end == target:
+                    return first, second, attacker
+        return attacker,
+
+    def get_threats(self, color):
+        """
+        Returns the opponent's pieces that attack color's General or could attack it once pieces move
+        Chariots and Cannons on a line with the General, Horses and Elephants a move away from it and Soldiers,
+        Guards and the General next to it, each with the spaces between it and the General
+        A piece of color standing on those spaces alone is pinned, a Cannon with no screen pins the empty spaces
+        Inputs: Color number (RED or BLUE)
+        Outputs: List of (attacker square, attacker type, tuple of squares between attacker and General)
+        """
+        general = self._generals[color]
+        opponent = 1 - color
+        squares = self._squares
+        threats = []
+        for square in self.get_squares(opponent):
+            kind = squares[square] & 7
+            if kind == CHARIOT or kind == CANNON:
+                if square % 9 == general % 9 or square // 9 == general // 9 or _PALACE_RAYS[square]:
+                    for ray in ORTHOGONAL_RAYS[square] + _PALACE_RAYS[square]:
+                        if general in ray:
+                            threats.append((square, kind, ray[:ray.index(general)]))
+                            break
+            elif kind == HORSE:
+                for passed, target in HORSE_MOVES[square]:
+                    if target == general:
+                        threats.append((square, kind, (passed,)))
+                        break
+            elif kind == ELEPHANT:
+                for first, second, target in ELEPHANT_MOVES[square]:
+                    if target == general:
+                        threats.append((square, kind, (first, second)))
+                        break
+            elif general in (SOLDIER_MOVES[opponent][square] if kind == SOLDIER else PALACE_MOVES[square]):
+                threats.append((square, kind, ()))
+        return threats
+
+    def is_legal_move(self, move, color, threats):
+        """
+        Returns True if a move from generate_moves does not leave color's General attacked
+        Moves of other pieces are checked against the threats without being played: the move is legal if every
+        threat is captured or still blocked afterwards (a Chariot, Horse or Elephant by any piece, a Cannon by no
+        piece or by two or more, or by one Cannon).  General moves are checked by _is_general_move_safe
+        Inputs: Packed move, color number of the side moving, threats from get_threats(color)
+        Outputs: True if the move is legal and False if not
+        """
+        from_square = move & 127
+        to_square = (move >> 7) & 127
+        if from_square == self._generals[color]:
+            return self._is_general_move_safe(from_square, to_square, color)
+        squares = self._squares
+        for attacker, kind, between in threats:
+            if attacker == to_square:
+                continue
+            count = 0
+            screen = 0
+            for square in between:
+                if square == to_square:
+                    code = squares[from_square]
+                elif square == from_square:
+                    continue
+                else:
+                    code = squares[square]
+                if code:
+                    count += 1
+                    screen = code
+            if kind == CANNON:
+                if count == 1 and screen & 7 != CANNON:
+                    return False
+            elif not count:
+                return False
+        return True
+
+    def _is_general_move_safe(self, from_square, to_square, color):
+        """
+        Returns True if color's General moving between squares is not attacked on its destination
+        The attack map is not changed: only the opponent's pieces whose attacks pass over either square (their
+        watchers) can attack differently after the move, their attacks are recalculated with the General moved,
+        every other attacker is read from the attack map
+        Inputs: From square and to square of the General's move, color number of the General
+        """
+        squares = self._squares
+        attacks = self._attacks
+        opponent = 1 - color
+        # A captured piece stops attacking, and never attacked its own square
+        watchers = (self._watchers[from_square] | self._watchers[to_square]) & self._color_occ[opponent] & \
+            ~(1 << to_square)
+        # Attackers of the destination the move does not affect
+        count = self._attack_counts[opponent][to_square]
+        mask = watchers
+        while mask:
+            lowest = mask & -mask
+            if to_square in attacks[lowest.bit_length() - 1]:
+                count -= 1
+            mask ^= lowest
+        if count:
+            return False
+        code = squares[from_square]
+        captured = squares[to_square]
+        self._vacate(from_square, code)
+        if captured:
+            self._vacate(to_square, captured)
+        self._occupy(to_square, code)
+        safe = True
+        while watchers:
+            lowest = watchers & -watchers
+            if to_square in self._calculate_attacks(lowest.bit_length() - 1)[0]:
+                safe = False
+                break
+            watchers ^= lowest
+        self._vacate(to_square, code)
+        if captured:
+            self._occupy(to_square, captured)
+        self._occupy(from_square, code)
+        return safe
+
+    def generals_facing(self):
+        """
+        Returns True if the two Generals are on the same file with no piece between them (bikjang)
+        One look at the file's occupancy mask
+        """
+        red = self._generals[RED]
+        blue = self._generals[BLUE]
+        if red < 0 or blue < 0 or red % 9 != blue % 9:
+            return False
+        # Bits of the rows strictly between the two Generals
+        between = (1 << (blue // 9)) - (1 << (red // 9 + 1))
+        return not self._file_occ[red % 9] & between
+
+    def compute_hash(self):
+        """
+        Returns 64-bit Zobrist hash of the piece placement, calculated from scratch
+        JanggiGame keeps the same hash (plus side to move) up to date move by move
+        """
+        squares = self._squares
+        position_hash = 0
+        for square in range(90):
+            position_hash ^= _ZOBRIST[squares[square]][square]
+        return position_hash
+
+    def get_squares(self, color):
+        """
+        Returns list of squares holding pieces of color
+        """
+        squares = []
+        occupied = self._color_occ[color]
+        while occupied:
+            lowest = occupied & -occupied
+            squares.append(lowest.bit_length() - 1)
+            occupied ^= lowest
+        return squares
+
+    def get_targets(self, square):
+        """
+        Returns list of squares the piece on square can move to
+        Does not check whether the move leaves the piece's own General in check
+        Inputs: Square number of the piece
+        Outputs: List of destination square numbers
+        """
+        squares = self._squares
+        color = squares[square] >> 3
+        return [target for target in self._attacks[square]
+                if not squares[target] or squares[target] >> 3 != color]
+
+    def generate_moves(self, color):
+        """
+        Returns list of packed moves for every piece of color
+        Does not check whether the move leaves the General of color in check
+        Inputs: Color number (RED or BLUE)
+        Outputs: List of packed integer moves (see encode_move)
+        """
+        squares = self._squares
+        attacks = self._attacks
+        moves = []
+        for from_square in self.get_squares(color):
+            for to_square in attacks[from_square]:
+                code = squares[to_square]
+                if not code or code >> 3 != color:
+                    moves.append(from_square | (to_square << 7) | (code << 14))
+        return moves
+
+    def is_attacked(self, square, by_color):
+        """
+        Returns True if any piece of by_color can move to square
+        Inputs: Square number and attacking color
+        Outputs: True if square is attacked and False if not
+        """
+        occupant = self._squares[square]
+        if occupant and occupant >> 3 == by_color:
+            return False
+        return self._attack_counts[by_color][square] > 0
+
+    def _calculate_attacks(self, square):
+        """
+        Returns the squares the piece on square attacks and the squares those attacks depend on
+        Inputs: Square number of the piece
+        Outputs: (list of attacked squares, list of squares whose contents decide the attacks)
+        """
+        squares = self._squares
+        code = squares[square]
+        kind = code & 7
+        column = square % 9
+        row = square // 9
+        attacks = []
+
+        # Chariot slides along ranks, files and fortress diagonals until it meets a piece
+        # The run tables give the number of empty spaces in each direction from the rank and file masks
+        if kind == CHARIOT or kind == CANNON:
+            rank_occ = self._rank_occ[row]
+            file_occ = self._file_occ[column]
+            right, left, up, down = ORTHOGONAL_RAYS[square]
+            right_runs, left_runs, up_runs, down_runs = _SLIDE_RUNS
+        if kind == CHARIOT:
+            attacks = (right[:right_runs[column][rank_occ] + 1] + left[:left_runs[column][rank_occ] + 1] +
+                       up[:up_runs[row][file_occ] + 1] + down[:down_runs[row][file_occ] + 1])
+            if _PALACE_RAYS[square]:
+                attacks = list(attacks)
+                for ray in _PALACE_RAYS[square]:
+                    for target in ray:
+                        attacks.append(target)
+                        if squares[target]:
+                            break
+            return attacks, attacks
+
+        # Cannon must jump exactly one piece that is not a cannon, and can not capture a cannon
+        # The first run ends at the piece it jumps, the second run (from that piece) at the piece it can capture
+        if kind == CANNON:
+            depends = []
+            for ray, runs, position, occupancy, by_rank in ((right, right_runs, column, rank_occ, True),
+                                                            (left, left_runs, column, rank_occ, True),
+                                                            (up, up_runs, row, file_occ, False),
+                                                            (down, down_runs, row, file_occ, False)):
+                run = runs[position][occupancy]
+                if run == len(ray) or squares[ray[run]] & 7 == CANNON:
+                    depends.extend(ray[:run + 1])
+                    continue
+                screen = ray[run]
+                end = run + 1 + runs[screen % 9 if by_rank else screen // 9][occupancy]
+                attacks.extend(ray[run + 1:end])
+                if end < len(ray) and squares[ray[end]] & 7 != CANNON:
+                    attacks.append(ray[end])
+                depends.extend(ray[:end + 1])
+            for ray in _PALACE_RAYS[square]:
+                if len(ray) == 2:
+                    depends.extend(ray)
+                    if squares[ray[0]] and squares[ray[0]] & 7 != CANNON and squares[ray[1]] & 7 != CANNON:
+                        attacks.append(ray[1])
+            return attacks, depends
+
+        # Horse steps one space orthogonally then one diagonally, Elephant then two diagonally
+        # The spaces passed over must be empty
+        if kind == HORSE:
+            for passed, target in HORSE_MOVES[square]:
+                if not squares[passed]:
+                    attacks.append(target)
+            return attacks, _HORSE_PASSED[square]
+        if kind == ELEPHANT:
+            for first, second, target in ELEPHANT_MOVES[square]:
+                if not squares[first] and not squares[second]:
+                    attacks.append(target)
+            return attacks, _ELEPHANT_PASSED[square]
+
+        # Soldier moves one space forward or sideways, and forward along the opponent's fortress diagonals
+        if kind == SOLDIER:
+            return SOLDIER_MOVES[code >> 3][square], ()
+
+        # General and Guard move one space along any line of their fortress
+        return PALACE_MOVES[square], ()
+
+
+class LegalMoveCache:
+    """
+    Bounded cache of legal move lists, keyed by (position hash, color)
+    Least recently used positions are dropped first once max_size is reached
+    Can be shared by many JanggiGame objects so positions repeated across games are only generated once
+    Counts hits and misses
+    """
+
+    def __init__(self, max_size=4096):
+        """
+        Initializes empty cache holding at most max_size positions (0 turns caching off)
+        """
+        self._entries = OrderedDict()
+        self._max_size = max_size
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        """
+        Returns cached tuple of packed moves for key, or None if the position is not cached
+        """
+        moves = self._entries.get(key)
+        if moves is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._entries.move_to_end(key)
+        return moves
+
+    def store(self, key, moves):
+        """
+        Stores moves for key, dropping the least recently used position if the cache is full
+        """
+        if self._max_size <= 0:
+            return
+        self._entries[key] = tuple(moves)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Empties the cache and resets hit and miss counters
+        """
+        self._entries.clear()
+        self._hits = 0
+        self._misses = 0
+
+    def get_hits(self):
+        """
+        Returns number of lookups that found the position
+        """
+        return self._hits
+
+    def get_misses(self):
+        """
+        Returns number of lookups that did not find the position
+        """
+        return self._misses
+
+    def get_size(self):
+        """
+        Returns number of positions currently cached
+        """
+        return len(self._entries)
+
+    def get_max_size(self):
+        """
+        Returns maximum number of positions kept
+        """
+        return self._max_size
+
+    def set_max_size(self, max_size):
+        """
+        Changes maximum number of positions kept, dropping the oldest ones if needed
+        """
+        self._max_size = max_size
+        while len(self._entries) > max(max_size, 0):
+            self._entries.popitem(last=False)
+
+
+# Cache used by every JanggiGame that is not given its own
+DEFAULT_MOVE_CACHE = LegalMoveCache()
+
+# Game states in the order they are numbered in a packed position
+GAME_STATES = ("UNFINISHED", "RED_WON", "BLUE_WON", "DRAW")
+# A position (pieces and player to move) reached this many times is a draw
+REPETITION_LIMIT = 3
+PACKED_SIZE = 46
+# Piece name abbreviations by type, as in "RCh1" and "BGen"
+_NAME_ABBREVIATIONS = ("", "Gen", "Gu", "El", "Ho", "Ch", "Ca", "So")
+
+# Position strings (FEN): ranks 10 down to 1 separated by "/", a letter per piece (upper case blue, lower case red)
+# and a digit per run of empty spaces, then the color to move ("b" or "r") and the game state
+# Letters: K General, A Guard, B Elephant, N Horse, R Chariot, C Cannon, P Soldier
+FEN_LETTERS = ("", "k", "a", "b", "n", "r", "c", "p")
+FEN_CODES = {letter: kind for kind, letter in enumerate(FEN_LETTERS) if letter}
+# Horse and Elephant setups, pieces on columns b, c, g and h from left to right (E Elephant, H Horse)
+# EHEH is 상마상마, HEHE 마상마상, HEEH 마상상마 and EHHE 상마마상
+SETUPS = ("EHEH", "HEHE", "HEEH", "EHHE")
+
+
+def get_start_fen(red_setup="EHEH", blue_setup="EHEH"):
+    """
+    Returns position string of the starting position with each side's Horse and Elephant setup
+    Inputs: Setup of red and of blue, one of SETUPS
+    Outputs: Position string for JanggiGame.from_fen
+    """
+    back_ranks = []
+    for setup in (blue_setup, red_setup):
+        if setup not in SETUPS:
+            raise ValueError("Unknown Horse and Elephant setup " + str(setup))
+        pieces = ["b" if letter == "E" else "n" for letter in setup]
+        back_ranks.append("r" + pieces[0] + pieces[1] + "a1a" + pieces[2] + pieces[3] + "r")
+    return (back_ranks[0].upper() + "/4K4/1C5C1/P1P1P1P1P/9/9/p1p1p1p1p/1c5c1/4k4/" + back_ranks[1] +
+            " b UNFINISHED")
+
+
+def _parse_placement(placement):
+    """
+    Returns piece codes by square of the placement field of a position string, ranks 10 to 1
+    Raises ValueError if the field does not have 10 ranks of 9 spaces of known pieces
+    Outputs: List of 90 piece codes (0 for empty)
+    """
+    ranks = placement.split("/")
+    if len(ranks) != 10:
+        raise ValueError("Position string must have 10 ranks")
+    squares = [0] * 90
+    for index, rank in enumerate(ranks):
+        row = 9 - index
+        column = 0
+        for letter in rank:
+            if letter.isdigit():
+                column += int(letter)
+            elif letter.lower() in FEN_CODES and column < 9:
+                squares[get_square(column, row)] = get_piece_code(BLUE if letter.isupper() else RED,
+                                                                  FEN_CODES[letter.lower()])
+                column += 1
+            else:
+                raise ValueError("Unknown piece " + letter + " in position string")
+        if column != 9:
+            raise ValueError("Rank " + str(row + 1) + " of position string does not have 9 spaces")
+    return squares
+
+
 class JanggiGame:
     """
     Where the game is played. This includes:
@@ -51,52 +1064,185 @@ class JanggiGame:
     Communicates with Pieces Class and Sub-Classes (different types of pieces)
     """
 
-    def __init__(self):
+    # Starting position copied by reset, made the first time it is needed
+    _start_game = None
+
+    def __init__(self, move_cache=None):
         """
         Initializes game, including the starting board, state, turn
+        move_cache is the LegalMoveCache to use, DEFAULT_MOVE_CACHE if not given
+        The Pieces objects on the board are shared by every game (see get_piece)
+        """
+        self._move_cache = DEFAULT_MOVE_CACHE if move_cache is None else move_cache
+        self.reset()
+
+    @classmethod
+    def from_packed(cls, data, move_cache=None):
+        """
+        Returns new game set up from a position packed with pack
+        The game has no move history, so moves played before the position can not be taken back
+        Inputs: Packed position bytes, optional LegalMoveCache
+        Outputs: JanggiGame
+        """
+        if len(data) != PACKED_SIZE:
+            raise ValueError("Packed position must be " + str(PACKED_SIZE) + " bytes")
+        squares = []
+        for byte in data[:45]:
+            squares.append(byte & 15)
+            squares.append(byte >> 4)
+        flags = data[45]
+        game = cls(move_cache)
+        game._set_position(squares, "blue" if flags & 1 else "red", GAME_STATES[(flags >> 1) & 3])
+        return game
+
+    @classmethod
+    def from_fen(cls, fen, move_cache=None):
         """
-        self._state = "UNFINISHED"
-        self._last_turn = "red"
-        self._board = [
-            [Chariots("RCh1", "a1", "red", "Chariot"), Elephants("REl1", "b1", "red", "Elephant"),
-             Horses("RHo1", "c1", "red", "Horse"), Guards("RGu1", "d1", "red", "Guard"), "",
-             Guards("RGu2", "f1", "red", "Guard"), Elephants("REl2", "g1", "red", "Elephant"),
-             Horses("RHo2", "h1", "red", "Horse"), Chariots("RCh2", "i1", "red", "Chariot")],
-            ["", "", "", "", Generals("RGen", "e2", "red", "General"), "", "", "", ""],
-            ["", Cannons("RCa1", "b3", "red", "Cannon"), "", "", "", "", "",
-             Cannons("RCa2", "h3", "red", "Cannon"), ""],
-            [Soldiers("RSo1", "a4", "red", "Soldier"), "",
-             Soldiers("RSo2", "c4", "red", "Soldier"), "",
-             Soldiers("RSo3", "e4", "red", "Soldier"), "",
-             Soldiers("RSo4", "g4", "red", "Soldier"), "",
-             Soldiers("RSo5", "i4", "red", "Soldier")],
-            ["", "", "", "", "", "", "", "", ""],
-            ["", "", "", "", "", "", "", "", ""],
-            [Soldiers("BSo1", "a7", "blue", "Soldier"), "",
-             Soldiers("BSo2", "c7", "blue", "Soldier"), "",
-             Soldiers("BSo3", "e7", "blue", "Soldier"), "",
-             Soldiers("BSo4", "g7", "blue", "Soldier"), "",
-             Soldiers("BSo5", "i7", "blue", "Soldier")],
-            ["", Cannons("BCa1", "b8", "blue", "Cannon"), "", "", "", "", "",
-             Cannons("BCa2", "h8", "blue", "Cannon"), ""],
-            ["", "", "", "", Generals("BGen", "e9", "blue", "General"), "", "", "", ""],
-            [Chariots("BCh1", "a10", "blue", "Chariot"),
-             Elephants("BEl1", "b10", "blue", "Elephant"),
-             Horses("BHo1", "c10", "blue", "Horse"), Guards("BGu1", "d10", "blue", "Guard"), "",
-             Guards("BGu2", "f10", "blue", "Guard"), Elephants("BEl2", "g10", "blue", "Elephant"),
-             Horses("BHo2", "h10", "blue", "Horse"), Chariots("BCh2", "i10", "blue", "Chariot")]]
+        Returns new game set up from a position string (see get_start_fen)
+        The color to move and game state fields may be left out, blue to move and UNFINISHED are assumed
+        Raises ValueError if the string is not a position with one General of each color inside its fortress
+        Inputs: Position string, optional LegalMoveCache
+        Outputs: JanggiGame
+        """
+        fields = fen.split()
+        if not 1 <= len(fields) <= 3:
+            raise ValueError("Position string must have placement, color to move and game state")
+        squares = _parse_placement(fields[0])
+        for color in (RED, BLUE):
+            generals = [square for square, code in enumerate(squares) if code == get_piece_code(color, GENERAL)]
+            if len(generals) != 1 or not in_palace(generals[0] % 9, generals[0] // 9) or \
+                    (generals[0] // 9 > 2) != (color == BLUE):
+                raise ValueError("Position string must have one " + COLOR_NAMES[color] + " General in its fortress")
+        to_move = fields[1] if len(fields) > 1 else "b"
+        state = fields[2] if len(fields) > 2 else "UNFINISHED"
+        if to_move not in ("b", "r") or state not in GAME_STATES:
+            raise ValueError("Position string must have b or r to move and a game state")
+        game = cls(move_cache)
+        game._set_position(squares, "red" if to_move == "b" else "blue", state)
+        return game
+
+    def get_fen(self):
+        """
+        Returns position string of the game: piece placement, color to move and game state
+        JanggiGame.from_fen turns it back into a game
+        """
+        squares = self._position.get_codes()
+        ranks = []
+        for row in range(9, -1, -1):
+            rank = ""
+            empty = 0
+            for code in squares[row * 9:row * 9 + 9]:
+                if not code:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                letter = FEN_LETTERS[code & 7]
+                rank += letter.upper() if code >> 3 == BLUE else letter
+            ranks.append(rank + (str(empty) if empty else ""))
+        return "/".join(ranks) + (" b " if self._last_turn == "red" else " r ") + self._state
+
+    def pack(self):
+        """
+        Returns the position as 46 bytes, for sending to other processes or storing
+        Two squares per byte (piece code in each half), then one byte holding whose turn it was last and the state
+        Inputs: None
+        Outputs: Bytes that from_packed turns back into a game
+        """
+        squares = self._position.get_codes()
+        data = bytearray(PACKED_SIZE)
+        for index in range(45):
+            data[index] = squares[2 * index] | (squares[2 * index + 1] << 4)
+        data[45] = (self._last_turn == "blue") | (GAME_STATES.index(self._state) << 1)
+        return bytes(data)
+
+    def _set_position(self, squares, last_turn, state):
+        """
+        Replaces the position with the pieces in squares and clears the move history
+        Pieces objects are numbered by color, type and count in square order, like those of the starting position
+        Inputs: 90 piece codes (0 for empty) by square, color that moved last, game state
+        """
+        counts = {}
+        rows = [[""] * 9 for _ in range(10)]
+        for square, code in enumerate(squares):
+            if not code:
+                continue
+            counts[code] = counts.get(code, 0) + 1
+            rows[square // 9][square % 9] = get_piece(code, counts[code])
+        # Pieces objects by square for the public API, piece codes live in the compact Board
+        self._pieces = [item for items in rows for item in items]
+        self._position = Board.from_rows(rows)
+        # One record per move played with push: (move, captured Pieces object, last turn, state, hash change)
+        self._undo = []
+        self._state = state
+        self._last_turn = last_turn
+        self._hash = self._position.compute_hash()
+        if last_turn == "blue":
+            self._hash ^= _ZOBRIST_RED_TO_MOVE
+        # Times each position hash has been reached, kept up to date by push and pop
+        self._position_counts = {self._hash: 1}
+
+    def reset(self):
+        """
+        Puts the game back to the starting position with no moves played
+        Copies a starting position made once per process, so it is quicker than setting up the pieces again
+        """
+        start = JanggiGame._start_game
+        if start is None:
+            start = JanggiGame.__new__(JanggiGame)
+            start._move_cache = LegalMoveCache(0)
+            start._set_position(_parse_placement(get_start_fen().split()[0]), "red", "UNFINISHED")
+            JanggiGame._start_game = start
+        # Pieces objects by square for the public API, piece codes live in the compact Board
+        self._pieces = list(start._pieces)
+        self._position = start._position.copy()
+        self._undo = []
+        self._state = start._state
+        self._last_turn = start._last_turn
+        self._hash = start._hash
+        self._position_counts = {start._hash: 1}
+
+    def clone(self):
+        """
+        Returns a new game in the same position, with the same move history and move cache
+        Pieces objects are shared and the Board's attack map is only copied once either game moves, so a clone
+        costs microseconds and only grows with what changes in it
+        """
+        game = JanggiGame.__new__(JanggiGame)
+        game._pieces = list(self._pieces)
+        game._position = self._position.copy()
+        game._undo = list(self._undo)
+        game._state = self._state
+        game._last_turn = self._last_turn
+        game._hash = self._hash
+        game._position_counts = dict(self._position_counts)
+        game._move_cache = self._move_cache
+        return game
+
+    def __copy__(self):
+        """
+        Returns clone of the game (see clone)
+        """
+        return self.clone()
+
+    def __deepcopy__(self, memo):
+        """
+        Returns clone of the game (see clone), which shares what can not change rather than copying it
+        """
+        return self.clone()
 
     def get_game_state(self):
         """
         Returns game state
-        Can be UNFINISHED, RED_WON, or BLUE_WON
+        Can be UNFINISHED, RED_WON, BLUE_WON or DRAW
         """
         return self._state
 
     def set_state(self, game_state):
         """
         Updates game state to either -
-        UNFINISHED, RED_WON or BLUE_WON
+        UNFINISHED, RED_WON, BLUE_WON or DRAW
         """
         self._state = game_state
 
@@ -105,6 +1251,8 @@ class JanggiGame:
         Sets last turn to who has gone last
         Used to determine who should make a move next
         """
+        if turn != self._last_turn:
+            self._hash ^= _ZOBRIST_RED_TO_MOVE
         self._last_turn = turn
 
     def get_item_from_board(self, column, row):
@@ -112,7 +1260,7 @@ class JanggiGame:
         Returns object that is in that space on the board
         Communicates with Pieces objects
         """
-        return self._board[row][column]
+        return self._pieces[get_square(column, row)]
 
     def get_last_turn(self):
         """
@@ -128,145 +1276,307 @@ class JanggiGame:
         2. Must be a legal move
         3. Game must not be won
         4. Determines if someone has won the game (by capturing opponents General)
+        5. Determines if the game is drawn by repetition or bikjang (see update_state)
         Communicates with Pieces class / sub-classes for piece information
         Outputs: True if move is legal and False if not
         """
+        move = self.find_move(current_space, move_space)
+        if move is None:
+            # Check if own General is in Check and checkmated, if so the opponent has won
+            item = self._pieces[get_space_square(current_space)]
+            if self.get_game_state() == 'UNFINISHED' and item != '' and item.get_color() != self.get_last_turn() \
+                    and self.is_in_check(item.get_color()) and self.is_checkmated(item.get_color()):
+                self.set_state("RED_WON" if item.get_color() == 'blue' else "BLUE_WON")
+            return False
+        # Make move, this also sets last turn == player turn
+        generals_facing = self._position.generals_facing()
+        self.push(move)
+        self.update_state(generals_facing)
+        return True
+
+    def find_move(self, current_space, move_space):
+        """
+        Returns the packed move for moving the player's piece from current_space to move_space, if it is legal
+        Same rules as make_move, without playing the move or changing the game state
+        Communicates with Pieces class / sub-classes for piece information
+        Inputs: Current space and move space ("a1" .. "i10"), the same space twice passes
+        Outputs: Packed move (see encode_move) or None if the move is not legal
+        """
 
-    # Translate alphabetical move space to numerical
-        current_column = current_space[0]
-        current_column_num = get_letter_to_num(current_column)
-        current_row = int(current_space[1:]) - 1
-        move_column = move_space[0]
-        move_column_num = get_letter_to_num(move_column)
-        move_row = int(move_space[1:]) - 1
+    # Translate alphabetical move space to board square
+        current_square = get_space_square(current_space)
+        move_square = get_space_square(move_space)
 
     # Piece that is in the current spot being played
-        item = self.get_item_from_board(int(current_column_num), int(current_row))
+        item = self._pieces[current_square]
 
     # Check if game is not won
         if self.get_game_state() != 'UNFINISHED':
-            return False
+            return None
     # Check if current space is not empty
         elif item == '':
-            return False
+            return None
     # Check if it is their turn
-        elif item != "" and item.get_color() == self.get_last_turn():
-            return False
-    # Check if passing turn, returns False if passing and General is in check
+        elif item.get_color() == self.get_last_turn():
+            return None
+    # Check if passing turn, not allowed if the General is in check
         elif current_space == move_space:
             if self.is_in_check(item.get_color()):
-                return False
-            self.set_last_turn(item.get_color)
-            return True
-    # Check if own General is in Check, if so, check if checkmated.  If not, General must be making the move
-        elif self.is_in_check(item.get_color()):
-            if self.is_checkmated(item.get_color()):
-                if item.get_color().lower() == 'blue':
-                    self.set_state("RED_WON")
-                    return False
-                if item.get_color().lower() == 'red':
-                    self.set_state("BLUE_WON")
-                    return False
-            # If in check and not checkmated, simulate move and check if general is still in check
-            else:
-                piece_moved = self.get_item_from_board(move_column_num, move_row)
-                self._board[move_row][move_column_num] = item
-                self._board[current_row][current_column_num] = ""
-                if self.is_in_check(item.get_color()):
-                    self._board[move_row][move_column_num] = piece_moved
-                    self._board[current_row][current_column_num] = item
-                    return False
-                self.set_last_turn(item.get_color())
-                return True
-    # General is not in check, simulate move (if legal) and ensure it does not put the general in check
-        elif move_space in item.get_legal_move(current_column_num, current_row, self.get_board()):
-            # Check first if they capture the general on the move
-            # Make move
-            piece_in_move = self.get_item_from_board(move_column_num, move_row)
-            self._board[move_row][move_column_num] = item
-            self._board[current_row][current_column_num] = ""
-            # Check if move makes own General in check, if it does, do not make move and return False
-            if self.is_in_check(item.get_color()):
-                self._board[move_row][move_column_num] = piece_in_move
-                self._board[current_row][current_column_num] = item
-                return False
-            # If it does not put General in check, move made and set last turn == player turn
-            self.set_last_turn(item.get_color())
-            return True
-    # Otherwise, the move is not legal and return false
+                return None
+            return encode_move(current_square, current_square)
+        move = encode_move(current_square, move_square, self._position.get_code(move_square))
+    # If this position's legal moves are cached, the move only has to be looked up
+        cached_moves = self._move_cache.get((self._hash, COLOR_CODES[item.get_color()]))
+        if cached_moves is not None:
+            return move if move in cached_moves else None
+    # Check the move is one the piece can make and that it does not leave the general in check
+        if move_square in self._position.get_targets(current_square):
+            color_num = COLOR_CODES[item.get_color()]
+            # Check the move does not leave own General in check, without playing it unless the General moves
+            if self._position.is_legal_move(move, color_num, self._position.get_threats(color_num)):
+                return move
+    # Otherwise, the move is not legal
+        return None
+
+    def update_state(self, generals_facing=False, checkmated=None):
+        """
+        Sets the game state after a move
+        1. Won if the move just made checkmated the opponent
+        2. Drawn by bikjang if the Generals were facing each other before the move (the opponent made them face)
+           and still are: the player did not break it
+        3. Drawn if the position has now been reached REPETITION_LIMIT times
+        Inputs: True if the Generals faced each other before the move, whether the opponent is checkmated if the
+        caller has already worked it out (None works it out with is_checkmated)
+        """
+        opponent = "blue" if self._last_turn == "red" else "red"
+        if checkmated is None:
+            checkmated = self.is_checkmated(opponent)
+        if checkmated:
+            self.set_state("RED_WON" if opponent == "blue" else "BLUE_WON")
+        elif generals_facing and self._position.generals_facing():
+            self.set_state("DRAW")
+        elif self._position_counts[self._hash] >= REPETITION_LIMIT:
+            self.set_state("DRAW")
+
+    def get_repetition_count(self):
+        """
+        Returns number of times the current position (pieces and player to move) has been reached in this game
+        """
+        return self._position_counts.get(self._hash, 0)
+
+    def is_bikjang(self):
+        """
+        Returns True if the Generals face each other on a file with no piece between them
+        """
+        return self._position.generals_facing()
+
+    def push(self, move):
+        """
+        Plays a packed move on the board without checking that it is legal
+        Saves an undo record so the move can be taken back with pop
+        Inputs: Packed integer move (see encode_move), a pass has the same from and to square
+        """
+        from_square = move & 127
+        to_square = (move >> 7) & 127
+        pieces = self._pieces
+        item = pieces[from_square]
+        hash_change = 0
+        if from_square != to_square:
+            code = self._position.get_code(from_square)
+            captured = self._position.move(from_square, to_square)
+            hash_change = _ZOBRIST[code][from_square] ^ _ZOBRIST[code][to_square] ^ _ZOBRIST[captured][to_square]
+            # Record the piece actually captured, whatever the caller packed into the move
+            move = from_square | (to_square << 7) | (captured << 14)
+        if item.get_color() != self._last_turn:
+            hash_change ^= _ZOBRIST_RED_TO_MOVE
+        self._undo.append((move, pieces[to_square], self._last_turn, self._state, hash_change))
+        if from_square != to_square:
+            pieces[to_square] = item
+            pieces[from_square] = ""
+        self._last_turn = item.get_color()
+        self._hash ^= hash_change
+        counts = self._position_counts
+        counts[self._hash] = counts.get(self._hash, 0) + 1
+
+    def pop(self):
+        """
+        Takes back the last move played with push (or make_move)
+        Restores the captured piece, whose turn it is and the game state
+        Outputs: Packed integer move that was taken back
+        """
+        move, captured_item, last_turn, state, hash_change = self._undo.pop()
+        counts = self._position_counts
+        if counts[self._hash] == 1:
+            del counts[self._hash]
         else:
-            return False
+            counts[self._hash] -= 1
+        from_square = move & 127
+        to_square = (move >> 7) & 127
+        if from_square != to_square:
+            self._position.undo_move(from_square, to_square, move >> 14)
+            self._pieces[from_square] = self._pieces[to_square]
+            self._pieces[to_square] = captured_item
+        self._last_turn = last_turn
+        self._state = state
+        self._hash ^= hash_change
+        return move
+
+    def get_hash(self):
+        """
+        Returns 64-bit Zobrist hash of the position
+        Covers where every piece is and whose turn it is, not the game state
+        Two games with the same pieces on the same spaces and the same player to move have the same hash
+        """
+        return self._hash
+
+    def get_position(self):
+        """
+        Returns the compact Board the game is played on
+        push and pop keep it up to date, it should not be changed directly
+        """
+        return self._position
+
+    def get_move_history(self):
+        """
+        Returns list of packed moves played so far, oldest first
+        """
+        return [record[0] for record in self._undo]
+
+    def legal_moves(self, color):
+        """
+        Yields the legal moves of color as packed integers (see encode_move), one at a time
+        Pins and checks against the General are found once (Board.get_threats), then each move is accepted or
+        rejected as it is asked for, so a caller that stops early does not pay for the rest
+        Once every move has been yielded the list is stored in the move cache
+        The game must be in the same position each time the generator resumes, RuntimeError is raised if not
+        Inputs: Color ("red" or "blue")
+        Outputs: Generator of packed integer moves
+        """
+        position = self._position
+        color_num = COLOR_CODES[color.lower()]
+        position_hash = self._hash
+        key = (position_hash, color_num)
+        cached = self._move_cache.get(key)
+        if cached is not None:
+            yield from cached
+            return
+        threats = position.get_threats(color_num)
+        legal_moves = []
+        for move in position.generate_moves(color_num):
+            if self._hash != position_hash:
+                raise RuntimeError("Position changed while its legal moves were being generated")
+            if position.is_legal_move(move, color_num, threats):
+                legal_moves.append(move)
+                yield move
+        self._move_cache.store(key, legal_moves)
+
+    def get_legal_moves(self, color):
+        """
+        Returns list of legal moves for color as packed integers (see encode_move)
+        Moves that would leave color's own General in check are left out
+        get_move_notation turns a packed move into the spaces make_move takes
+        Inputs: Color ("red" or "blue")
+        Outputs: List of packed integer moves
+        """
+        return list(self.legal_moves(color))
+
+    def get_playable_moves(self):
+        """
+        Returns list of moves the side to move can play: its legal moves, then a pass if it is not in check
+        The pass is packed with the General's square as both from and to square
+        Outputs: List of packed integer moves (see encode_move)
+        """
+        color = "blue" if self._last_turn == "red" else "red"
+        moves = self.get_legal_moves(color)
+        if not self.is_in_check(color):
+            general = self._position.get_general(COLOR_CODES[color])
+            moves.append(encode_move(general, general))
+        return moves
+
+    def get_move_cache(self):
+        """
+        Returns the LegalMoveCache used by this game
+        """
+        return self._move_cache
 
     def is_checkmated(self, color):
         """
         Checks if General is checkmated and therefore opposing player wins game
-        Checkmate is when a General cannot make a move that allows it to escape check
-        """
-        general_moves = []
-        opponent_moves = []
-
-        # Get list of opponents moves
-        row_count = 0
-        for rows in self._board:
-            column_count = 0
-            for item in rows:
-                if item != "" and item.get_color().lower() != color.lower():
-                    for move in item.get_legal_move(column_count, row_count, self.get_board()):
-                        opponent_moves.append(move)
-                column_count += 1
-            row_count += 1
-
-        # Get list of general's legal moves
-        row_count = 0
-        for lists in self._board:
-            column_count = 0
-            for item in lists:
-                if item != "" and item.get_color().lower() == color.lower() and item.get_type().lower() == 'general':
-                    for move in item.get_legal_move(column_count, row_count, self.get_board()):
-                        general_moves.append(move)
-                column_count += 1
-            row_count += 1
-
-        # If a space in general's legal moves == space in opponents legal moves, general is checkmated
-        for space in general_moves:
-            if space not in opponent_moves:
-                return False
+        Checkmate is when the General is in check and no legal move gets it out of check
+        Passing is allowed when not in check, so a player that is not in check is never stuck
+        Outputs: True if color is checkmated and False if not
+        """
+        color_num = COLOR_CODES[color.lower()]
+        general = self._position.get_general(color_num)
+        if general < 0:
+            return True
+        if not self._position.is_attacked(general, 1 - color_num):
+            return False
+        cached = self._move_cache.get((self._hash, color_num))
+        if cached is not None:
+            return not cached
+        return self._find_evasion(color_num) is None
 
-        return True
+    def _find_evasion(self, color_num):
+        """
+        Returns the first legal move that gets color_num's General out of check, or None if there is none
+        Only tries moves that can answer every checking piece:
+        1. General moves
+        2. Moves leaving or landing on a square each checker's attack depends on (see Board.get_block_squares):
+           capturing it, blocking a Chariot, adding or removing a Cannon screen, blocking a Horse or Elephant
+        With two checkers a move has to touch the squares of both, which is rarely possible
+        Inputs: Color number that is in check
+        Outputs: Packed integer move or None
+        """
+        position = self._position
+        general = position.get_general(color_num)
+        opponent = 1 - color_num
+
+        # General moves first, they are the only answer to most double checks
+        for target in position.get_targets(general):
+            move = encode_move(general, target, position.get_code(target))
+            self.push(move)
+            safe = not position.is_attacked(target, opponent)
+            self.pop()
+            if safe:
+                return move
+
+        block_sets = [set(position.get_block_squares(checker, general))
+                      for checker in position.get_attackers(general, opponent)]
+        for move in position.generate_moves(color_num):
+            from_square = move & 127
+            to_square = (move >> 7) & 127
+            if from_square == general:
+                continue
+            for block_squares in block_sets:
+                if from_square not in block_squares and to_square not in block_squares:
+                    break
+            else:
+                self.push(move)
+                safe = not position.is_attacked(general, opponent)
+                self.pop()
+                if safe:
+                    return move
+        return None
 
     def is_in_check(self, color):
         """
         Returns true if color is in check and false if not
-        Checks each piece and determines if one of their legal moves includes the spot
-        that contains the general
+        Looks up the spot that contains the general in the opponent's attack map
         Outputs: True if color is in check and False if not
         """
-        # Looks at opponent pieces and sees if a move includes the current players general
-        row_count = 0
-        for lists in self._board:
-            column_count = 0
-            for item in lists:
-                # look at opponents pieces
-                if item != "" and item.get_color().lower() != color.lower():
-                    # gather opponents legal moves of all players
-                    for piece in item.get_legal_move(column_count, row_count, self.get_board()):
-                        current_column = piece[0]
-                        current_column_num = get_letter_to_num(current_column)
-                        current_row = int(piece[1:]) - 1
-                        # if a legal move has the general, it is in check
-                        if self._board[current_row][current_column_num] != "" and\
-                                self._board[current_row][current_column_num].get_type().lower() == "general" and\
-                                self._board[current_row][current_column_num].get_color().lower() == color.lower():
-                            return True
-                column_count += 1
-            row_count += 1
-        return False
+        color_num = COLOR_CODES[color.lower()]
+        general = self._position.get_general(color_num)
+        if general < 0:
+            return False
+        return self._position.is_attacked(general, 1 - color_num)
 
     def get_board(self):
         """
         Returns game board
+        List of 10 rows, each holding the Pieces object or "" of each column
         """
-        return self._board
+        return [self._pieces[row * 9:row * 9 + 9] for row in range(10)]
 
     def print_board(self):
         """
@@ -276,25 +1586,26 @@ class JanggiGame:
         columns = [' a  ', " b  ", " c  ", " d  ", " e  ", " f  ", " g  ", " h  ", " i  "]
 
         print("  ", columns)
-        first_row = [x.get_name() if x != "" else "    " for x in self._board[0]]
+        board = self.get_board()
+        first_row = [x.get_name() if x != "" else "    " for x in board[0]]
         print("1 ", first_row)
-        second_row = [x.get_name() if x != "" else "    " for x in self._board[1]]
+        second_row = [x.get_name() if x != "" else "    " for x in board[1]]
         print("2 ", second_row)
-        third_row = [x.get_name() if x != "" else "    " for x in self._board[2]]
+        third_row = [x.get_name() if x != "" else "    " for x in board[2]]
         print("3 ", third_row)
-        four_row = [x.get_name() if x != "" else "    " for x in self._board[3]]
+        four_row = [x.get_name() if x != "" else "    " for x in board[3]]
         print("4 ", four_row)
-        five_row = [x.get_name() if x != "" else "    " for x in self._board[4]]
+        five_row = [x.get_name() if x != "" else "    " for x in board[4]]
         print("5 ", five_row)
-        six_row = [x.get_name() if x != "" else "    " for x in self._board[5]]
+        six_row = [x.get_name() if x != "" else "    " for x in board[5]]
         print("6 ", six_row)
-        seven_row = [x.get_name() if x != "" else "    " for x in self._board[6]]
+        seven_row = [x.get_name() if x != "" else "    " for x in board[6]]
         print("7 ", seven_row)
-        eight_row = [x.get_name() if x != "" else "    " for x in self._board[7]]
+        eight_row = [x.get_name() if x != "" else "    " for x in board[7]]
         print("8 ", eight_row)
-        nine_row = [x.get_name() if x != "" else "    " for x in self._board[8]]
+        nine_row = [x.get_name() if x != "" else "    " for x in board[8]]
         print("9 ", nine_row)
-        ten_row = [x.get_name() if x != "" else "    " for x in self._board[9]]
+        ten_row = [x.get_name() if x != "" else "    " for x in board[9]]
         print("10", ten_row)
 
 
@@ -312,19 +1623,46 @@ class Pieces:
     2. Characteristics of each piece with JanggiGame class
     """
 
+    __slots__ = ("_name", "_color", "_type")
+    # Board bounds, the same for every piece
+    MIN_COLUMN = 0
+    MAX_COLUMN = 8
+    MIN_ROW = 0
+    MAX_ROW = 9
+
     def __init__(self, name, place, color, type):
         """
-        Initializes piece
-        Including: Piece nickname, type, color and min/max board rows and columns
+        Initializes piece: nickname, color and type
+        Pieces do not know where they are (place is the space the piece is made for and is not kept), so one object
+        can stand for the piece in every game, see get_piece
         """
-        self._name = name
-        self._type = type
-        self._place = place
-        self._color = color
-        self._min_column = 0
-        self._max_column = 8
-        self._min_row = 0
-        self._max_row = 9
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_color", color)
+        object.__setattr__(self, "_type", type)
+
+    def __setattr__(self, name, value):
+        """
+        Pieces are shared between games and can not be changed once made
+        """
+        raise AttributeError("Pieces objects can not be changed")
+
+    def __copy__(self):
+        """
+        Returns the piece itself, it can not change so a copy would be the same
+        """
+        return self
+
+    def __deepcopy__(self, memo):
+        """
+        Returns the piece itself, it can not change so a copy would be the same
+        """
+        return self
+
+    def __reduce__(self):
+        """
+        Returns how to make the piece again, for pickle
+        """
+        return type(self), (self._name, None, self._color, self._type)
 
     def get_name(self):
         """
@@ -345,139 +1683,30 @@ class Pieces:
         """
         return self._type
 
+    def get_legal_move(self, column, row, board):
+        """
+        Returns list of valid moves for the piece as game-play spaces ("a1" .. "i10")
+        Column and Row is where the piece currently is
+        Inputs: Current column #, row # and board
+        Outputs: List of all possible legal moves from current space
+        """
+        return [SPACE_NAMES[move_row * 9 + move_column]
+                for move_column, move_row in self.get_move_spaces(column, row, board)]
+
     def general_guard_moves(self, column, row, board):
         """
         Returns list of general and guard legal moves
         Only called by General and Guard pieces
         Uses same logic for both since they can both make the same moves
+        Walks the precomputed fortress lines (PALACE_MOVES) of the current space
         Inputs: Current column #, row # and board
-        Outputs: List of all possible legal moves from current space
+        Outputs: List of (column, row) of all possible legal moves from current space
         """
         legal_moves = []
-
-        # Since general and guards can only move in the fortress, this outputs all legal moves in that space
-        # Diagonal moves are 'hardcoded'
-        if self.get_color() == "blue":
-            if column != 4 or row != 8:
-                if board[8][4] == "" or board[8][4].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(4) + str(9))
-            if column == 3 and row == 7:
-                if board[7][4] == "" or board[7][4].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(4) + str(8))
-                if board[8][3] == "" or board[8][3].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(3) + str(9))
-            if column == 4 and row == 7:
-                if board[7][3] == "" or board[7][3].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(3) + str(8))
-                if board[7][5] == "" or board[7][5].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(5) + str(8))
-            if column == 5 and row == 7:
-                if board[7][4] == "" or board[7][4].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(4) + str(8))
-                if board[8][5] == "" or board[8][5].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(5) + str(9))
-            if column == 3 and row == 8:
-                if board[7][3] == "" or board[7][3].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(3) + str(8))
-                if board[9][3] == "" or board[9][3].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(3) + str(10))
-            if column == 4 and row == 8:
-                col = 3
-                for spot in board[7][3:6]:
-                    if spot == "" or spot.get_color() != self.get_color():
-                        legal_moves.append(get_num_to_letter(col) + str(8))
-                    col += 1
-                col = 3
-                for spot in board[8][3:6]:
-                    if spot == "" or spot.get_color() != self.get_color():
-                        legal_moves.append(get_num_to_letter(col) + str(9))
-                    col += 1
-                col = 3
-                for spot in board[9][3:6]:
-                    if spot == "" or spot.get_color() != self.get_color():
-                        legal_moves.append(get_num_to_letter(col) + str(10))
-                    col += 1
-            if column == 5 and row == 8:
-                if board[7][5] == "" or board[7][5].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(5) + str(8))
-                if board[9][5] == "" or board[9][5].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(5) + str(10))
-            if column == 3 and row == 9:
-                if board[8][3] == "" or board[8][3].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(3) + str(9))
-                if board[9][4] == "" or board[9][4].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(4) + str(10))
-            if column == 4 and row == 9:
-                if board[9][3] == "" or board[9][3].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(3) + str(10))
-                if board[9][5] == "" or board[9][5].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(5) + str(10))
-            if column == 5 and row == 9:
-                if board[9][4] == "" or board[9][4].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(4) + str(10))
-                if board[8][5] == "" or board[8][5].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(5) + str(9))
-
-        if self.get_color() == "red":
-            if column != 4 or row != 1:
-                if board[1][4] == "" or board[1][4].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(4) + str(2))
-            if column == 3 and row == 0:
-                if board[0][4] == "" or board[0][4].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(4) + str(1))
-                if board[1][3] == "" or board[1][3].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(3) + str(2))
-            if column == 4 and row == 0:
-                if board[0][3] == "" or board[0][3].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(3) + str(1))
-                if board[0][5] == "" or board[0][5].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(5) + str(1))
-            if column == 5 and row == 0:
-                if board[0][4] == "" or board[0][4].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(4) + str(1))
-                if board[1][5] == "" or board[1][5].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(5) + str(2))
-            if column == 3 and row == 1:
-                if board[0][3] == "" or board[0][3].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(3) + str(1))
-                if board[2][3] == "" or board[2][3].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(3) + str(3))
-            if column == 4 and row == 1:
-                col = 3
-                for spot in board[0][3:6]:
-                    if spot == "" or spot.get_color() != self.get_color():
-                        legal_moves.append(get_num_to_letter(col) + str(1))
-                    col += 1
-                col = 3
-                for spot in board[1][3:6]:
-                    if spot == "" or spot.get_color() != self.get_color():
-                        legal_moves.append(get_num_to_letter(col) + str(2))
-                    col += 1
-                col = 3
-                for spot in board[2][3:6]:
-                    if spot == "" or spot.get_color() != self.get_color():
-                        legal_moves.append(get_num_to_letter(col) + str(3))
-                    col += 1
-            if column == 5 and row == 1:
-                if board[0][5] == "" or board[0][5].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(5) + str(1))
-                if board[2][5] == "" or board[2][5].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(5) + str(3))
-            if column == 3 and row == 2:
-                if board[1][3] == "" or board[1][3].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(3) + str(2))
-                if board[2][4] == "" or board[2][4].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(4) + str(3))
-            if column == 4 and row == 2:
-                if board[2][3] == "" or board[2][3].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(3) + str(3))
-                if board[2][5] == "" or board[2][5].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(5) + str(3))
-            if column == 5 and row == 2:
-                if board[2][4] == "" or board[2][4].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(4) + str(3))
-                if board[1][5] == "" or board[1][5].get_color() != self.get_color():
-                    legal_moves.append(get_num_to_letter(5) + str(2))
+        for target in PALACE_MOVES[get_square(column, row)]:
+            spot = board[target // 9][target % 9]
+            if spot == "" or spot.get_color() != self.get_color():
+                legal_moves.append((target % 9, target // 9))
 
         return legal_moves
 
@@ -491,82 +1720,22 @@ class Soldiers(Pieces):
     Communicates legal moves with JanggiGame class
     """
 
-    def right_left_move(self, column, row, board):
-        """
-        Adds right and left moves to soldier pieces
-        Inputs: Current column #, row # and board
-        Outputs: List of all possible legal moves from current space
-        """
-        column_p1 = int(column) + 1
-        column_m1 = int(column) - 1
-        soldier_legal_moves = []
-
-        # Move right
-        if column_p1 <= self._max_column and row >= self._min_row:
-            if board[row][column_p1] == "" \
-                    or board[row][column_p1].get_color != self.get_color():
-                soldier_legal_moves.append(get_num_to_letter(column_p1) + str(row + 1))
-        # Move left
-        if column_m1 >= self._min_column and row >= self._min_row:
-            if board[row][column_m1] == "" \
-                    or board[row][column_m1].get_color != self.get_color():
-                soldier_legal_moves.append(get_num_to_letter(column_m1) + str(row + 1))
-
-        return soldier_legal_moves
+    __slots__ = ()
 
-    def get_legal_move(self, column, row, board):
+    def get_move_spaces(self, column, row, board):
         """
         Returns list of valid moves for Soldier
         Column and Row is where the piece currently is
-        Takes into account piece color to understand if they should move up or down
-        and what fortress they can be in
+        Walks the precomputed steps of the current space for the piece's color (SOLDIER_MOVES), which go forward
+        towards the opponent, sideways and diagonally forward in the opponent's fortress
         Inputs: Current column #, row # and board
-        Outputs: List of all possible legal moves from current space
+        Outputs: List of (column, row) of all possible legal moves from current space
         """
-
         soldier_legal_moves = []
-
-        current_space_board = str(get_num_to_letter(column)) + str(row + 1)
-        row_p1 = int(row) + 1
-        row_m1 = int(row) - 1
-
-
-        if self.get_color() == 'blue':
-            # fortress moves
-            if row == 2 and (column == 3 or column == 5):
-                if board[1][4] == "" or board[1][4].get_color() != self.get_color():
-                    soldier_legal_moves.append(get_num_to_letter(4) + str(2))
-            if row == 1 and column == 4:
-                if board[0][3] == "" or board[0][3].get_color() != self.get_color():
-                    soldier_legal_moves.append(get_num_to_letter(3) + str(1))
-                if board[0][5] == "" or board[0][5].get_color() != self.get_color():
-                    soldier_legal_moves.append(get_num_to_letter(5) + str(1))
-            # blue can only go down in row #
-            if row_m1 >= self._min_row and self._min_column <= column <= self._max_column:
-                if board[row_m1][column] == "" \
-                        or board[row_m1][column] != self.get_color():
-                    soldier_legal_moves.append(get_num_to_letter(column) + str(row_m1 + 1))
-            for move in self.right_left_move(column, row, board):
-                soldier_legal_moves.append(move)
-
-
-        if self.get_color() == "red":
-            # fortress moves
-            if row == 7 and (column == 3 or column == 5):
-                if board[8][4] == "" or board[8][4].get_color() != self.get_color():
-                    soldier_legal_moves.append(get_num_to_letter(4) + str(9))
-            if row == 8 and column == 4:
-                if board[9][3] == "" or board[9][3].get_color() != self.get_color():
-                    soldier_legal_moves.append(get_num_to_letter(3) + str(10))
-                if board[9][5] == "" or board[9][5].get_color() != self.get_color():
-                    soldier_legal_moves.append(get_num_to_letter(5) + str(10))
-            # red can only go up in row #
-            if row_p1 >= self._min_row and self._min_column <= column <= self._max_column:
-                if board[row_p1][column] == "" \
-                        or board[row_p1][column] != self.get_color():
-                    soldier_legal_moves.append(get_num_to_letter(column) + str(row_p1 + 1))
-            for move in self.right_left_move(column, row, board):
-                soldier_legal_moves.append(move)
+        for target in SOLDIER_MOVES[COLOR_NAMES.index(self.get_color())][get_square(column, row)]:
+            spot = board[target // 9][target % 9]
+            if spot == "" or spot.get_color() != self.get_color():
+                soldier_legal_moves.append((target % 9, target // 9))
 
         return soldier_legal_moves
 
@@ -580,12 +1749,14 @@ class Generals(Pieces):
     Communicates legal moves with JanggiGame class
     """
 
-    def get_legal_move(self, column, row, board):
+    __slots__ = ()
+
+    def get_move_spaces(self, column, row, board):
         """
         Returns list of valid moves for General
         column and row is where the piece currently is
         Inputs: Current column #, row # and board
-        Outputs: List of all possible legal moves from current space
+        Outputs: List of (column, row) of all possible legal moves from current space
         """
         return self.general_guard_moves(column, row, board)
 
@@ -598,12 +1769,14 @@ class Guards(Pieces):
     Communicates legal moves with JanggiGame class
     """
 
-    def get_legal_move(self, column, row, board):
+    __slots__ = ()
+
+    def get_move_spaces(self, column, row, board):
         """
         Returns list of valid moves for Guard
         Column and Row is where the piece currently is
         Inputs: Current column #, row # and board
-        Outputs: List of all possible legal moves from current space
+        Outputs: List of (column, row) of all possible legal moves from current space
         """
         return self.general_guard_moves(column, row, board)
 
@@ -617,126 +1790,30 @@ class Chariots(Pieces):
     Communicates legal moves with JanggiGame class
     """
 
-    def diagonal_moves(self, column_1, row_1, column_2, row_2, board, chariot_legal_moves):
-        """
-        Adds diagonal moves to legal moves when Chariot is in either fortress
-        Inputs: Possible diagonal move coordinates (column_1, row_1, column_2, row_2)
-                Board, and list of chariot_legal_moves
-        Outputs: List of all possible diagonal moves from current space if in fortress
-        """
-        # calculates fortress diagonal moves
-        if board[row_1][column_1] == "":
-            chariot_legal_moves.append(get_num_to_letter(column_1) + str(row_1 + 1))
-            if board[row_2][column_2] == "" or board[row_2][column_2].get_color() != self.get_color():
-                chariot_legal_moves.append(get_num_to_letter(column_2) + str(row_2 + 1))
-        elif board[row_1][column_1].get_color() != self.get_color():
-            chariot_legal_moves.append(get_num_to_letter(column_1) + str(row_1 + 1))
-
-        return
+    __slots__ = ()
 
-    def get_legal_move(self, column, row, board):
+    def get_move_spaces(self, column, row, board):
         """
         Returns list of valid moves for Chariot
         column and row is where the piece currently is
+        Walks the precomputed rays of the current space (ORTHOGONAL_RAYS and fortress diagonals)
         Inputs: Current column #, row # and board
-        Outputs: List of all possible legal moves from current space
+        Outputs: List of (column, row) of all possible legal moves from current space
         """
         chariot_legal_moves = []
-
-        # If in fortress, gets diagonal moves available
-        # Center space in red fortress
-        if column == 4 and row == 8:
-            col = 3
-            for spot in board[7][3:6]:
-                if spot == "" or spot.get_color() != self.get_color():
-                    chariot_legal_moves.append(get_num_to_letter(col) + str(8))
-                col += 1
-            col = 3
-            for spot in board[8][3:6]:
-                if spot == "" or spot.get_color() != self.get_color():
-                    chariot_legal_moves.append(get_num_to_letter(col) + str(9))
-                col += 1
-            col = 3
-            for spot in board[9][3:6]:
-                if spot == "" or spot.get_color() != self.get_color():
-                    chariot_legal_moves.append(get_num_to_letter(col) + str(10))
-                col += 1
-        # Center space in blue fortress
-        if column == 4 and row == 1:
-            col = 3
-            for spot in board[0][3:6]:
-                if spot == "" or spot.get_color() != self.get_color():
-                    chariot_legal_moves.append(get_num_to_letter(col) + str(1))
-                col += 1
-            col = 3
-            for spot in board[1][3:6]:
-                if spot == "" or spot.get_color() != self.get_color():
-                    chariot_legal_moves.append(get_num_to_letter(col) + str(2))
-                col += 1
-            col = 3
-            for spot in board[2][3:6]:
-                if spot == "" or spot.get_color() != self.get_color():
-                    chariot_legal_moves.append(get_num_to_letter(col) + str(3))
-                col += 1
-        # red corners
-        if column == 3 and row == 0:
-            self.diagonal_moves(4, 1, 5, 2, board, chariot_legal_moves)
-        if column == 5 and row == 0:
-            self.diagonal_moves(4, 1, 3, 2, board, chariot_legal_moves)
-        if column == 3 and row == 2:
-            self.diagonal_moves(4, 1, 5, 0, board, chariot_legal_moves)
-        if column == 5 and row == 2:
-            self.diagonal_moves(4, 1, 3, 0, board, chariot_legal_moves)
-        # blue corners
-        if column == 3 and row == 7:
-            self.diagonal_moves(4, 8, 5, 9, board, chariot_legal_moves)
-        if column == 5 and row == 7:
-            self.diagonal_moves(4, 8, 3, 9, board, chariot_legal_moves)
-        if column == 3 and row == 9:
-            self.diagonal_moves(4, 8, 5, 7, board, chariot_legal_moves)
-        if column == 5 and row == 9:
-            self.diagonal_moves(4, 8, 3, 7, board, chariot_legal_moves)
-
-        # Checks horizontally
-        # Checks spaces to the right, if it comes across another piece it stops adding to legal moves
-        for i in range(column + 1, self._max_column + 1):
-            if board[row][i] == '':
-                chariot_legal_moves.append(get_num_to_letter(i) + str(row + 1))
-            elif board[row][i].get_color() != self.get_color():
-                chariot_legal_moves.append(get_num_to_letter(i) + str(row + 1))
-                break
-            else:
-                break
-
-        # Checks spaces to the left, if it comes across another piece it stops adding to legal moves
-        for i in range(column - 1, -1, -1):
-            if board[row][i] == '':
-                chariot_legal_moves.append(get_num_to_letter(i) + str(row + 1))
-            elif board[row][i].get_color() != self.get_color():
-                chariot_legal_moves.append(get_num_to_letter(i) + str(row + 1))
-                break
-            else:
-                break
-
-        # Checks vertically
-        # Checks up, if it comes across another piece it stops adding to legal moves
-        for i in range(row - 1, -1, -1):
-            if board[i][column] == '':
-                chariot_legal_moves.append(get_num_to_letter(column) + str(i + 1))
-            elif board[i][column].get_color() != self.get_color():
-                chariot_legal_moves.append(get_num_to_letter(column) + str(i + 1))
-                break
-            else:
-                break
-
-        # Checks down, if it comes across another piece it stops adding to legal moves
-        for i in range(row + 1, self._max_row + 1):
-            if board[i][column] == '':
-                chariot_legal_moves.append(get_num_to_letter(column) + str(i + 1))
-            elif board[i][column].get_color() != self.get_color():
-                chariot_legal_moves.append(get_num_to_letter(column) + str(i + 1))
-                break
-            else:
+        square = get_square(column, row)
+        color = self.get_color()
+
+        # Slides right, left, up, down and along fortress diagonals
+        # If it comes across another piece it stops adding to legal moves (after capturing an opponent)
+        for ray in ORTHOGONAL_RAYS[square] + _PALACE_RAYS[square]:
+            for target in ray:
+                spot = board[target // 9][target % 9]
+                if spot == "":
+                    chariot_legal_moves.append((target % 9, target // 9))
+                    continue
+                if spot.get_color() != color:
+                    chariot_legal_moves.append((target % 9, target // 9))
                 break
 
         return chariot_legal_moves
@@ -752,54 +1829,22 @@ class Horses(Pieces):
     Communicates legal moves with JanggiGame class
     """
 
-    def get_legal_move(self, column, row, board):
+    __slots__ = ()
+
+    def get_move_spaces(self, column, row, board):
         """
         Returns list of valid moves for Horse
         column and row is where the piece currently is
         Inputs: Current column #, row # and board
-        Outputs: List of all possible legal moves from current space
+        Outputs: List of (column, row) of all possible legal moves from current space
         """
         horse_legal_moves = []
-        # right
-        if (column + 1 <= self._max_column) and board[row][column+1] == "":
-            # right and up
-            if (column + 2 <= self._max_column) and (row - 1 >= self._min_row) and\
-                    (board[row-1][column+2] == "" or board[row-1][column+2].get_color() != self.get_color()):
-                horse_legal_moves.append(get_num_to_letter(column+2) + str(row))
-            # right and down
-            if (column + 2 <= self._max_column) and (row + 1 <= self._max_row) and\
-                    (board[row+1][column+2] == "" or board[row+1][column+2].get_color() != self.get_color()):
-                horse_legal_moves.append(get_num_to_letter(column + 2) + str(row+2))
-        #  left
-        if (column - 1 >= self._min_column) and board[row][column-1] == "":
-            # left and up
-            if (column - 2 >= self._min_column) and (row - 1 >= self._min_row) and \
-                    (board[row - 1][column - 2] == "" or board[row - 1][column - 2].get_color() != self.get_color()):
-                horse_legal_moves.append(get_num_to_letter(column - 2) + str(row))
-            # left and down
-            if (column - 2 >= self._min_column) and (row + 1 <= self._max_row) and \
-                    (board[row + 1][column - 2] == "" or board[row + 1][column - 2].get_color() != self.get_color()):
-                horse_legal_moves.append(get_num_to_letter(column - 2) + str(row + 2))
-        # down
-        if (row + 1 <= self._max_row) and board[row+1][column] == "":
-            # down and right
-            if (column + 1 <= self._max_column) and (row + 2 <= self._max_row) and\
-                    (board[row+2][column+1] == "" or board[row+2][column+1].get_color() != self.get_color()):
-                horse_legal_moves.append(get_num_to_letter(column+1) + str(row+3))
-            # down and left
-            if (column - 1 >= self._min_column) and (row + 2 <= self._max_row) and\
-                    (board[row+2][column-1] == "" or board[row+2][column-1].get_color() != self.get_color()):
-                horse_legal_moves.append(get_num_to_letter(column-1) + str(row+3))
-        # up
-        if (row - 1 >= self._min_row) and board[row-1][column] == "":
-            # up and right
-            if (column + 1 <= self._max_column) and (row - 2 >= self._min_row) and\
-                    (board[row-2][column+1] == "" or board[row-2][column+1].get_color() != self.get_color()):
-                horse_legal_moves.append(get_num_to_letter(column+1) + str(row-1))
-            # up and left
-            if (column - 1 >= self._min_column) and (row - 2 >= self._min_row) and\
-                    (board[row-2][column-1] == "" or board[row-2][column-1].get_color() != self.get_color()):
-                horse_legal_moves.append(get_num_to_letter(column-1) + str(row-1))
+        # Each jump is blocked if the space it passes over is taken
+        for passed, target in HORSE_MOVES[get_square(column, row)]:
+            if board[passed // 9][passed % 9] == "":
+                spot = board[target // 9][target % 9]
+                if spot == "" or spot.get_color() != self.get_color():
+                    horse_legal_moves.append((target % 9, target // 9))
 
         return horse_legal_moves
 
@@ -814,64 +1859,24 @@ class Elephants(Pieces):
     Communicates legal moves with JanggiGame class
     """
 
-    def get_legal_move(self, column, row, board):
+    __slots__ = ()
+
+    def get_move_spaces(self, column, row, board):
         """
         Returns list of valid moves for Elephant
         column and row is where the piece currently is
         Inputs: Current column #, row # and board
-        Outputs: List of all possible legal moves from current space
+        Outputs: List of (column, row) of all possible legal moves from current space
         """
 
         elephant_legal_moves = []
 
-        # Right
-        if (column + 1 <= self._max_column) and board[row][column+1] == "":
-            # right and up
-            if (column + 2 <= self._max_column) and (row - 1 >= self._min_row) and board[row-1][column+2] == "":
-                if (column + 3 <= self._max_column) and (row - 2 >= self._min_row) and\
-                        (board[row-2][column+3] == "" or board[row-2][column+3].get_color() != self.get_color()):
-                    elephant_legal_moves.append(get_num_to_letter(column+3) + str(row-1))
-            # right and down
-            if (column + 2 <= self._max_column) and (row + 1 <= self._max_row) and board[row+1][column+2] == "":
-                if (column + 3 <= self._max_column) and (row + 2 <= self._max_row) and\
-                        (board[row+2][column+3] == "" or board[row+2][column+3].get_color() != self.get_color()):
-                    elephant_legal_moves.append(get_num_to_letter(column + 3) + str(row+3))
-        # Left
-        if (column - 1 >= self._min_column) and board[row][column-1] == "":
-            # left and up
-            if (column - 2 >= self._min_column) and (row - 1 >= self._min_row) and board[row - 1][column - 2] == "":
-                if (column - 3 >= self._min_column) and (row - 2 >= self._min_row) and\
-                        (board[row - 2][column - 3] == "" or board[row - 2][column - 3].get_color() != self.get_color()):
-                    elephant_legal_moves.append(get_num_to_letter(column - 3) + str(row-1))
-            # left and down
-            if (column - 2 >= self._min_column) and (row + 1 <= self._max_row) and board[row + 1][column - 2] == "":
-                if (column - 3 >= self._min_column) and (row + 2 <= self._max_row) and\
-                        (board[row + 2][column - 3] == "" or board[row + 2][column - 3].get_color() != self.get_color()):
-                    elephant_legal_moves.append(get_num_to_letter(column - 3) + str(row + 3))
-        # Down
-        if (row + 1 <= self._max_row) and board[row+1][column] == "":
-            # down and right
-            if (column + 1 <= self._max_column) and (row + 2 <= self._max_row) and board[row+2][column+1] == "":
-                if (column + 2 <= self._max_column) and (row + 3 <= self._max_row) and\
-                        (board[row+3][column+2] == "" or board[row+3][column+2].get_color() != self.get_color()):
-                    elephant_legal_moves.append(get_num_to_letter(column+2) + str(row+4))
-            # down and left
-            if (column - 1 >= self._min_column) and (row + 2 <= self._max_row) and board[row+2][column-1] == "":
-                if (column - 2 >= self._min_column) and (row + 3 <= self._max_row) and\
-                        (board[row+3][column-2] == "" or board[row+3][column-2].get_color() != self.get_color()):
-                    elephant_legal_moves.append(get_num_to_letter(column-2) + str(row+4))
-        # up
-        if (row - 1 >= self._min_row) and board[row-1][column] == "":
-            # up and right
-            if (column + 1 <= self._max_column) and (row - 2 >= self._min_row) and board[row-2][column+1] == "":
-                if (column + 2 <= self._max_column) and (row - 3 >= self._min_row) and\
-                        (board[row-3][column+2] == "" or board[row-3][column+2].get_color() != self.get_color()):
-                    elephant_legal_moves.append(get_num_to_letter(column+2) + str(row-2))
-            # up and left
-            if (column - 1 >= self._min_column) and (row - 2 >= self._min_row) and board[row-2][column-1] == "":
-                if (column - 2 >= self._min_column) and (row - 3 >= self._min_row) and\
-                        (board[row-3][column-2] == "" or board[row-3][column-2].get_color() != self.get_color()):
-                    elephant_legal_moves.append(get_num_to_letter(column-2) + str(row-2))
+        # Each jump is blocked if either space it passes over is taken
+        for first, second, target in ELEPHANT_MOVES[get_square(column, row)]:
+            if board[first // 9][first % 9] == "" and board[second // 9][second % 9] == "":
+                spot = board[target // 9][target % 9]
+                if spot == "" or spot.get_color() != self.get_color():
+                    elephant_legal_moves.append((target % 9, target // 9))
 
         return elephant_legal_moves
 
@@ -886,113 +1891,90 @@ class Cannons(Pieces):
     Communicates legal moves with JanggiGame class
     """
 
-    def diagonal_move_cannon(self, column_1, row_1, board, cannon_legal_moves):
-        """
-        Makes diagonal move for cannons when in fortress
-        Must have piece in middle spot of fortress to move diagonally
-        Inputs: Possible diagonal move coordinates (column_1, row_1) board and list of cannon legal moves)
-        Outputs: List of all possible diagonal moves from current space
-        """
-        # Must have piece in center square of fortress to get here
-        if board[row_1][column_1] == ""\
-                or (board[row_1][column_1].get_color() != self.get_color() and
-                    board[row_1][column_1].get_type() != self.get_type()):
-            cannon_legal_moves.append(get_num_to_letter(column_1) + str(row_1 + 1))
-
-        return
+    __slots__ = ()
 
-    def get_legal_move(self, column, row, board):
+    def get_move_spaces(self, column, row, board):
         """
         Returns list of valid moves for Cannon
         Column and Row is where the piece currently is
+        Walks the precomputed rays of the current space (ORTHOGONAL_RAYS and fortress diagonals)
         Inputs: Current column #, row # and board
-        Outputs: List of all possible legal moves from current space
+        Outputs: List of (column, row) of all possible legal moves from current space
         """
         cannon_legal_moves = []
+        square = get_square(column, row)
+        color = self.get_color()
+
+        # Right, left, up, down and fortress diagonals: jumps the first piece (unless it is a cannon)
+        # and can land on any empty space after it or capture the next piece if it is an opponent
+        for ray in ORTHOGONAL_RAYS[square] + _PALACE_RAYS[square]:
+            jumped = False
+            for target in ray:
+                spot = board[target // 9][target % 9]
+                if not jumped:
+                    if spot != "":
+                        if spot.get_type() == "Cannon":
+                            break
+                        jumped = True
+                elif spot == "":
+                    cannon_legal_moves.append((target % 9, target // 9))
+                else:
+                    if spot.get_color() != color and spot.get_type() != "Cannon":
+                        cannon_legal_moves.append((target % 9, target // 9))
+                    break
 
-        # Checks if in the fortress, if there is no piece in the middle, don't check
-        if board[1][4] != "" and board[1][4].get_type() != self.get_type():
-            if row == 0 and column == 3:
-                self.diagonal_move_cannon(5, 2, board, cannon_legal_moves)
-            if row == 0 and column == 5:
-                self.diagonal_move_cannon(3, 2, board, cannon_legal_moves)
-            if row == 2 and column == 3:
-                self.diagonal_move_cannon(5, 0, board, cannon_legal_moves)
-            if row == 2 and column == 5:
-                self.diagonal_move_cannon(3, 0, board, cannon_legal_moves)
-        if board[8][4] != "" and board[8][4].get_type() != self.get_type():
-            if row == 7 and column == 3:
-                self.diagonal_move_cannon(5, 9, board, cannon_legal_moves)
-            if row == 7 and column == 5:
-                self.diagonal_move_cannon(3, 9, board, cannon_legal_moves)
-            if row == 9 and column == 3:
-                self.diagonal_move_cannon(5, 7, board, cannon_legal_moves)
-            if row == 9 and column == 5:
-                self.diagonal_move_cannon(3, 7, board, cannon_legal_moves)
-
-        # Checks horizontally
-        # Checks spaces to the right, if it comes across another piece it jumps over (unless it is a cannon)
-        # And can land on empty space or capture opponent
-        jumped = False
-        for i in range(column + 1, self._max_column + 1):
-            if board[row][i] != '' and board[row][i].get_type() != self.get_type() and not jumped:
-                jumped = True
-            elif board[row][i] == '' and jumped:
-                cannon_legal_moves.append(get_num_to_letter(i) + str(row + 1))
-            elif board[row][i] != '' and board[row][i].get_color() != self.get_color() and\
-                    board[row][i].get_type() != self.get_type() and jumped:
-                cannon_legal_moves.append(get_num_to_letter(i) + str(row+1))
-                break
-            elif board[row][i] != '' and board[row][i].get_type() == self.get_type() and jumped:
-                break
+        return cannon_legal_moves
 
-        # Checks spaces to the left, if it comes across another piece it jumps over (unless it is a cannon)
-        # And can land on empty space or capture opponent
-        jumped = False
-        for i in range(column - 1, -1, -1):
-            if board[row][i] != '' and board[row][i].get_type() != self.get_type() and not jumped:
-                jumped = True
-            elif board[row][i] == '' and jumped:
-                cannon_legal_moves.append(get_num_to_letter(i) + str(row + 1))
-            elif board[row][i] != '' and board[row][i].get_color() != self.get_color() and\
-                    board[row][i].get_type() != self.get_type() and jumped:
-                cannon_legal_moves.append(get_num_to_letter(i) + str(row+1))
-                break
-            elif board[row][i] != '' and board[row][i].get_type() == self.get_type() and jumped:
-                break
 
-        # Checks vertically
-        # Checks up, if it comes across another piece it jumps over (unless it is a cannon)
-        # And can land on empty space or capture opponent
-        jumped = False
-        for i in range(row - 1, -1, -1):
-            if board[i][column] != '' and board[i][column].get_type() != self.get_type() and not jumped:
-                jumped = True
-            elif board[i][column] == '' and jumped:
-                cannon_legal_moves.append(get_num_to_letter(column) + str(i + 1))
-            elif board[i][column] != '' and board[i][column].get_color() != self.get_color() and\
-                    board[i][column].get_type() != self.get_type() and jumped:
-                cannon_legal_moves.append(get_num_to_letter(column) + str(i+1))
-                break
-            elif board[i][column] != '' and board[i][column].get_type() == self.get_type() and jumped:
-                break
+# Shared Pieces objects by (piece code, number), made by get_piece the first time they are needed
+_PIECE_FLYWEIGHTS = {}
 
-        # Checks down, if it comes across another piece it jumps over (unless it is a cannon)
-        # And can land on empty space or capture opponent
-        jumped = False
-        for i in range(row + 1, self._max_row + 1):
-            if board[i][column] != '' and board[i][column].get_type() != self.get_type() and not jumped:
-                jumped = True
-            elif board[i][column] == '' and jumped:
-                cannon_legal_moves.append(get_num_to_letter(column) + str(i + 1))
-            elif board[i][column] != '' and board[i][column].get_color() != self.get_color() and\
-                    board[i][column].get_type() != self.get_type() and jumped:
-                cannon_legal_moves.append(get_num_to_letter(column) + str(i+1))
-                break
-            elif board[i][column] != '' and board[i][column].get_type() == self.get_type() and jumped:
-                break
 
-        return cannon_legal_moves
+def get_piece(code, number=1):
+    """
+    Returns the Pieces object for the number-th piece of a code, named like the starting position's pieces
+    Pieces can not be changed, so every game shares one object per name
+    Inputs: Piece code (see get_piece_code), count of the piece among those of its color and type, from 1
+    Outputs: Pieces sub-class object, like Chariots("RCh1", ...) for get_piece(get_piece_code(RED, CHARIOT), 1)
+    """
+    piece = _PIECE_FLYWEIGHTS.get((code, number))
+    if piece is None:
+        kind = code & 7
+        color = COLOR_NAMES[code >> 3]
+        name = color[0].upper() + _NAME_ABBREVIATIONS[kind] + ("" if kind == GENERAL else str(number))
+        piece_class = (None, Generals, Guards, Elephants, Horses, Chariots, Cannons, Soldiers)[kind]
+        piece = _PIECE_FLYWEIGHTS[(code, number)] = piece_class(name, None, color, TYPE_NAMES[kind])
+    return piece
+
+
+def main(args):
+    """
+    Plays a game from the command line, printing the board after every move
+    Moves are read one per line as two spaces, like "c7 c6" (the same space twice passes), until the game is won,
+    "quit" is entered or input ends
+    Inputs: Command line arguments, --fen=FEN starts from that position (see JanggiGame.from_fen)
+    Outputs: 0
+    """
+    game = JanggiGame()
+    for arg in args:
+        if arg.startswith("--fen="):
+            game = JanggiGame.from_fen(arg[len("--fen="):])
+    game.print_board()
+    while game.get_game_state() == "UNFINISHED":
+        print(("Blue" if game.get_last_turn() == "red" else "Red") + " to move:")
+        line = sys.stdin.readline()
+        if not line or line.strip() == "quit":
+            break
+        spaces = line.split()
+        if len(spaces) != 2 or spaces[0] not in SPACE_SQUARES or spaces[1] not in SPACE_SQUARES:
+            print("Enter a move as two spaces, like c7 c6")
+        elif not game.make_move(spaces[0], spaces[1]):
+            print("Illegal move")
+        else:
+            game.print_board()
+    print(game.get_game_state())
+    return 0
+
 
-game = JanggiGame()
-game.print_board()
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,213 @@
+# Description: Parallel search for JanggiGame across worker processes.  Either splits the root moves between the
+# workers or runs Lazy SMP (every worker searches the whole position, sharing what they find through a
+# transposition table in shared memory).  Workers get a 46 byte packed position and its hash, not Pieces objects.
+#
+# Usage: parallel_best_move(game, time_limit_ms, max_depth, workers, mode) or, to keep the worker processes
+# between moves, ParallelEngine(workers, mode).search(game, time_limit_ms, max_depth) then close()
+
+import ctypes
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.sharedctypes import RawArray
+
+from JanggiEngine import JanggiEngine, SearchResult, MAX_DEPTH, MATE_SCORE
+from JanggiGame import JanggiGame, LegalMoveCache
+
+ROOT_SPLIT = "root"
+LAZY_SMP = "lazy"
+
+# Shared table slots are two 64-bit words: hash XOR data, then data
+# Data bits: move 0-17, depth 18-25, entry kind 26-27, score + _SCORE_OFFSET 28-48
+_SCORE_OFFSET = 1 << 20
+
+# Set up in each worker process by _start_worker
+_worker_table = None
+_worker_engine = None
+
+
+class SharedTranspositionTable:
+    """
+    Transposition table in shared memory that every worker process reads and writes
+    Fixed number of slots, a position goes in slot hash % slots and replaces whatever was there
+    Entries are written without locks, each slot stores the hash XOR its data so an entry torn by two
+    processes writing at once does not match any hash and is ignored
+    """
+
+    def __init__(self, slots=1 << 20, memory=None):
+        """
+        Creates a new zeroed table of slots entries, or uses the shared memory of an existing one
+        """
+        self._slots = slots
+        self._memory = RawArray(ctypes.c_uint64, slots * 2) if memory is None else memory
+        self._words = memoryview(self._memory).cast("B").cast("Q")
+
+    def get_memory(self):
+        """
+        Returns the shared memory holding the table, passed to worker processes when they start
+        """
+        return self._memory
+
+    def get_slots(self):
+        """
+        Returns number of entries the table holds
+        """
+        return self._slots
+
+    def get(self, position_hash):
+        """
+        Returns (depth, score, entry kind, best move) stored for position_hash, or None
+        """
+        index = (position_hash % self._slots) * 2
+        data = self._words[index + 1]
+        if self._words[index] ^ data != position_hash or not data:
+            return None
+        return ((data >> 18) & 255, ((data >> 28) & 0x1FFFFF) - _SCORE_OFFSET, (data >> 26) & 3, data & 0x3FFFF)
+
+    def store(self, position_hash, entry):
+        """
+        Stores (depth, score, entry kind, best move) for position_hash
+        """
+        depth, score, kind, move = entry
+        data = move | (depth << 18) | (kind << 26) | ((score + _SCORE_OFFSET) << 28)
+        index = (position_hash % self._slots) * 2
+        self._words[index] = position_hash ^ data
+        self._words[index + 1] = data
+
+    def clear(self):
+        """
+        Empties the table
+        """
+        ctypes.memset(self._memory, 0, self._slots * 16)
+
+
+def _start_worker(table_memory, table_slots):
+    """
+    Sets up a worker process: attaches the shared table (if any) and makes the engine it searches with
+    """
+    global _worker_table, _worker_engine
+    if table_memory is not None:
+        _worker_table = SharedTranspositionTable(table_slots, table_memory)
+    _worker_engine = JanggiEngine(table=_worker_table)
+
+
+def _search_worker(packed, position_hash, time_limit_ms, max_depth, root_moves, seed):
+    """
+    Searches a packed position in a worker process
+    Inputs: Packed position, its hash, time limit in milliseconds, maximum depth, root moves to search
+    (None for all), seed for move ordering ties (None for none)
+    Outputs: (list of (depth, move, score, principal variation) for every iteration that finished,
+    positions searched including the iteration cut short by the time limit)
+    """
+    game = JanggiGame.from_packed(packed, LegalMoveCache(0))
+    if game.get_hash() != position_hash:
+        raise ValueError("Packed position does not match its hash")
+    engine = _worker_engine
+    if seed is not None:
+        engine = JanggiEngine(table=_worker_table, seed=seed)
+    nodes = engine.search(game, time_limit_ms, max_depth, root_moves).get_nodes()
+    return [(result.get_depth(), result.get_move(), result.get_score(), result.get_principal_variation())
+            for result in engine.get_iterations()], nodes
+
+
+def _static_best(game, moves):
+    """
+    Returns (move, score) of the move with the best static evaluation once played, for when no search finished
+    Inputs: JanggiGame, list of packed legal moves of the side to move
+    Outputs: (packed move, evaluation for the side to move)
+    """
+    position = game.get_position()
+    color_num = 0 if game.get_last_turn() == "blue" else 1
+    best = None
+    for move in moves:
+        game.push(move)
+        score = position.evaluate(color_num)
+        game.pop()
+        if best is None or score > best[1]:
+            best = (move, score)
+    return best
+
+
+class ParallelEngine:
+    """
+    Searches JanggiGame positions with a pool of worker processes
+    1. ROOT_SPLIT: the legal moves are dealt out between the workers, each searches only its own moves,
+       and the best move of the deepest depth every worker finished wins (if a worker finished none, the move
+       with the best static evaluation)
+    2. LAZY_SMP: every worker searches every move, their move orders differ so they explore different parts
+       of the tree first, and the deepest finished search wins
+    With shared_table_slots the workers share one transposition table in shared memory, which is what makes
+    Lazy SMP faster than one process
+    """
+
+    def __init__(self, workers=None, mode=LAZY_SMP, shared_table_slots=1 << 20):
+        """
+        Starts worker processes (one per CPU if workers is not given)
+        Inputs: Number of workers, ROOT_SPLIT or LAZY_SMP, shared table size (0 for a table per worker)
+        """
+        if mode not in (ROOT_SPLIT, LAZY_SMP):
+            raise ValueError("Unknown parallel search mode " + str(mode))
+        self._workers = workers or os.cpu_count() or 1
+        self._mode = mode
+        self._table = SharedTranspositionTable(shared_table_slots) if shared_table_slots else None
+        self._executor = ProcessPoolExecutor(
+            self._workers, initializer=_start_worker,
+            initargs=(self._table.get_memory() if self._table else None, shared_table_slots))
+
+    def search(self, game, time_limit_ms=1000, max_depth=MAX_DEPTH):
+        """
+        Returns best move for the side to move found by all workers within the time limit
+        Inputs: JanggiGame, time limit in milliseconds, maximum depth in plies
+        Outputs: SearchResult, nodes counts the positions searched by every worker
+        """
+        start = time.perf_counter()
+        packed = game.pack()
+        position_hash = game.get_hash()
+        moves = game.get_playable_moves()
+        if not moves or game.get_game_state() != "UNFINISHED":
+            return SearchResult(None, -MATE_SCORE if not moves else 0, 0, [], 0, time.perf_counter() - start)
+        if self._mode == ROOT_SPLIT:
+            parts = [moves[index::self._workers] for index in range(min(self._workers, len(moves)))]
+            futures = [self._executor.submit(_search_worker, packed, position_hash, time_limit_ms, max_depth,
+                                             part, None) for part in parts]
+        else:
+            futures = [self._executor.submit(_search_worker, packed, position_hash, time_limit_ms, max_depth,
+                                             None, index or None) for index in range(self._workers)]
+        results = [future.result() for future in futures]
+        nodes = sum(worker_nodes for _, worker_nodes in results)
+        results = [iterations for iterations, _ in results if iterations]
+        # A root split worker that finished no iteration leaves its moves unsearched, so every move is judged
+        # by its static evaluation instead
+        if not results or (self._mode == ROOT_SPLIT and len(results) < len(futures)):
+            move, score = _static_best(game, moves)
+            return SearchResult(move, score, 0, [move], nodes, time.perf_counter() - start)
+
+        if self._mode == ROOT_SPLIT:
+            depth = min(iterations[-1][0] for iterations in results)
+            best = max((iterations[depth - 1] for iterations in results), key=lambda iteration: iteration[2])
+        else:
+            best = max((iterations[-1] for iterations in results), key=lambda iteration: iteration[0])
+        depth, move, score, principal_variation = best
+        return SearchResult(move, score, depth, principal_variation, nodes, time.perf_counter() - start)
+
+    def close(self):
+        """
+        Stops the worker processes
+        """
+        self._executor.shutdown()
+
+
+def parallel_best_move(game, time_limit_ms=1000, max_depth=MAX_DEPTH, workers=None, mode=LAZY_SMP,
+                       shared_table_slots=1 << 20):
+    """
+    Returns best move for the side to move in game, searched by several processes
+    Starts and stops a worker pool for this one search, use ParallelEngine to keep one between moves
+    Inputs: JanggiGame, time limit in milliseconds, maximum depth, number of workers, ROOT_SPLIT or LAZY_SMP,
+    shared table size (0 for none)
+    Outputs: SearchResult
+    """
+    engine = ParallelEngine(workers, mode, shared_table_slots)
+    try:
+        return engine.search(game, time_limit_ms, max_depth)
+    finally:
+        engine.close()
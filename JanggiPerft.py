@@ -0,0 +1,144 @@
+# Description: Perft (performance test) for the Janggi move generator.  Counts the leaf nodes of the legal move
+# tree to a fixed depth, from the starting position or from stored test positions, and reports nodes per second.
+# Used to check that move generation still gives the same counts and to time it after every change.
+#
+# Usage: python JanggiPerft.py [position] [depth] [--divide] [--no-pass] [--cache]
+
+import sys
+import time
+
+from JanggiGame import JanggiGame, LegalMoveCache, get_move_notation
+
+# Stored test positions: name -> (moves played from the starting position, {depth: expected leaf nodes})
+# Counts include passing, which is legal whenever the side to move is not in check
+PERFT_POSITIONS = {
+    "start": ([], {1: 32, 2: 1024, 3: 33506, 4: 1095844}),
+    "attack": ([("e7", "f7"), ("a4", "b4"), ("i10", "i8"), ("a1", "a7"), ("a10", "a7"), ("f1", "e1"),
+                ("a7", "a2"), ("e2", "f1")],
+               {1: 43, 2: 1042, 3: 42926}),
+    "middle": ([("h10", "i8"), ("e2", "f2"), ("d10", "e10"), ("f2", "e2"), ("a7", "a6"), ("h1", "i3"),
+                ("e9", "e8"), ("e2", "f3"), ("c10", "e9"), ("i3", "h1"), ("i10", "i9"), ("g4", "f4"),
+                ("i9", "h9"), ("i1", "i3"), ("e10", "d10"), ("d1", "e1"), ("h8", "c8"), ("c1", "d3"),
+                ("e7", "d7"), ("f3", "e3")],
+               {1: 42, 2: 1242, 3: 52466}),
+    "check": ([("e7", "e6"), ("h1", "g3"), ("c7", "b7"), ("c4", "b4"), ("h10", "g8"), ("i1", "i2"),
+               ("b7", "b6"), ("d1", "e1"), ("b6", "a6"), ("a4", "a5"), ("e9", "d9"), ("b1", "d4"),
+               ("h8", "f8"), ("e4", "f4"), ("c10", "d8"), ("i2", "i3"), ("b8", "e8")],
+              {1: 7, 2: 279, 3: 11219, 4: 456037}),
+}
+
+
+def get_side_to_move(game):
+    """
+    Returns color whose turn it is in game
+    """
+    return "blue" if game.get_last_turn() == "red" else "red"
+
+
+def get_perft_moves(game, passes=True):
+    """
+    Returns list of packed moves the side to move can play, a pass (same from and to square) included if allowed
+    Inputs: JanggiGame, whether passing counts as a move
+    Outputs: List of packed integer moves
+    """
+    if passes:
+        return game.get_playable_moves()
+    return game.get_legal_moves(get_side_to_move(game))
+
+
+def perft(game, depth, passes=True):
+    """
+    Returns number of leaf nodes of the legal move tree depth plies deep
+    The game is back in the same position when perft returns
+    Inputs: JanggiGame, depth in plies, whether passing counts as a move
+    Outputs: Number of leaf nodes
+    """
+    if depth <= 0:
+        return 1
+    moves = get_perft_moves(game, passes)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        game.push(move)
+        nodes += perft(game, depth - 1, passes)
+        game.pop()
+    return nodes
+
+
+def divide(game, depth, passes=True):
+    """
+    Returns leaf node count below each root move, used to find which move a wrong perft count comes from
+    Inputs: JanggiGame, depth in plies (at least 1), whether passing counts as a move
+    Outputs: List of ((current space, move space), nodes) in move generation order
+    """
+    counts = []
+    for move in get_perft_moves(game, passes):
+        game.push(move)
+        counts.append((get_move_notation(move), perft(game, depth - 1, passes)))
+        game.pop()
+    return counts
+
+
+def get_perft_position(name, move_cache=None):
+    """
+    Returns new JanggiGame with the stored position's moves played
+    move_cache defaults to an empty cache so perft times the move generator and not cache lookups
+    Inputs: Name of stored position in PERFT_POSITIONS, optional LegalMoveCache
+    Outputs: JanggiGame
+    """
+    game = JanggiGame(move_cache=LegalMoveCache(0) if move_cache is None else move_cache)
+    for current_space, move_space in PERFT_POSITIONS[name][0]:
+        if not game.make_move(current_space, move_space):
+            raise ValueError("Stored position " + name + " has illegal move " + current_space + move_space)
+    return game
+
+
+def run_perft(name, depth, passes=True, move_cache=None):
+    """
+    Returns (nodes, seconds taken, nodes per second) for perft of a stored position
+    """
+    game = get_perft_position(name, move_cache)
+    start = time.perf_counter()
+    nodes = perft(game, depth, passes)
+    seconds = time.perf_counter() - start
+    return nodes, seconds, nodes / seconds if seconds > 0 else 0.0
+
+
+def main(args):
+    """
+    Runs perft from the command line and prints node counts and speed
+    With no position given every stored position is run and checked against its expected counts
+    Outputs: 0 if every count matches the expected count, 1 if not
+    """
+    passes = "--no-pass" not in args
+    move_cache = LegalMoveCache() if "--cache" in args else None
+    values = [arg for arg in args if not arg.startswith("--")]
+    names = [values[0]] if values else list(PERFT_POSITIONS)
+    depth = int(values[1]) if len(values) > 1 else None
+    failed = False
+
+    for name in names:
+        expected_counts = PERFT_POSITIONS[name][1]
+        for current_depth in ([depth] if depth is not None else sorted(expected_counts)):
+            if "--divide" in args:
+                game = get_perft_position(name, move_cache)
+                total = 0
+                for (current_space, move_space), nodes in divide(game, current_depth, passes):
+                    print(current_space + move_space, nodes)
+                    total += nodes
+                print("total", total)
+                continue
+            nodes, seconds, speed = run_perft(name, current_depth, passes, move_cache)
+            expected = expected_counts.get(current_depth) if passes else None
+            result = ""
+            if expected is not None:
+                result = "ok" if nodes == expected else "FAILED expected " + str(expected)
+                failed = failed or nodes != expected
+            print("%-8s depth %d %10d nodes %8.3fs %10.0f nodes/s %s" % (name, current_depth, nodes, seconds, speed,
+                                                                     result))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
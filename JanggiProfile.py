@@ -0,0 +1,225 @@
+# Description: Opt-in profiling of the JanggiGame hot paths.  A Profiler counts and times the calls to make_move,
+# is_in_check, is_checkmated, get_legal_moves, push and pop, Board.generate_moves, and Board._calculate_attacks and
+# Board.is_legal_move per piece type, and counts legal move cache hits and misses.  The methods are wrapped when
+# the profiler is enabled and put back when it is disabled, so nothing is slower while no profiler is running.
+#
+# Usage: with Profiler() as profiler: game.make_move(...) then profiler.get_counters(), profiler.print_report() or
+# profiler.dump("profile.json")
+
+import json
+import sys
+import time
+from functools import wraps
+
+from JanggiGame import TYPE_NAMES, Board, JanggiGame, LegalMoveCache
+
+# Methods timed, by class, and the name each is reported under
+_TIMED_METHODS = ((JanggiGame, "make_move", "make_move"),
+                  (JanggiGame, "is_in_check", "is_in_check"),
+                  (JanggiGame, "is_checkmated", "is_checkmated"),
+                  (JanggiGame, "get_legal_moves", "get_legal_moves"),
+                  (JanggiGame, "push", "push (play move)"),
+                  (JanggiGame, "pop", "pop (take back move)"),
+                  (Board, "generate_moves", "generate_moves"))
+
+
+class Profiler:
+    """
+    Call counts and times of the JanggiGame hot paths while enabled
+    Only one profiler can be enabled at a time, it affects every JanggiGame in the process
+    """
+
+    _active = None
+
+    def __init__(self, slowest=0):
+        """
+        Initializes disabled profiler with empty counters
+        slowest keeps the position (as a FEN string, see JanggiGame.get_fen) and spaces of that many of the slowest
+        make_move calls, which costs a get_fen call per move
+        """
+        self._counters = {}
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._slowest = slowest
+        self._slow_moves = []
+        self._originals = []
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+        return False
+
+    def is_enabled(self):
+        """
+        Returns True if this profiler's wrappers are in place
+        """
+        return Profiler._active is self
+
+    def enable(self):
+        """
+        Wraps the profiled methods, counting from now on
+        Raises RuntimeError if another profiler is enabled
+        """
+        if Profiler._active is self:
+            return
+        if Profiler._active is not None:
+            raise RuntimeError("Another Profiler is already enabled")
+        Profiler._active = self
+        for cls, method_name, report_name in _TIMED_METHODS:
+            self._wrap(cls, method_name, self._get_timer(cls.__dict__[method_name], report_name))
+        if self._slowest:
+            self._wrap(JanggiGame, "make_move", self._get_move_recorder(JanggiGame.make_move))
+        self._wrap(Board, "_calculate_attacks", self._get_piece_timer(Board._calculate_attacks, "calculate_attacks"))
+        self._wrap(Board, "is_legal_move", self._get_piece_timer(Board.is_legal_move, "is_legal_move"))
+        self._wrap(LegalMoveCache, "get", self._get_cache_counter(LegalMoveCache.get))
+
+    def disable(self):
+        """
+        Puts the original methods back, the counters are kept
+        """
+        if Profiler._active is not self:
+            return
+        for cls, method_name, method in reversed(self._originals):
+            setattr(cls, method_name, method)
+        self._originals = []
+        Profiler._active = None
+
+    def reset(self):
+        """
+        Sets every counter back to zero
+        """
+        self._counters = {}
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._slow_moves = []
+
+    def _wrap(self, cls, method_name, wrapper):
+        """
+        Replaces a method of cls with wrapper, remembering the method to put back
+        """
+        self._originals.append((cls, method_name, cls.__dict__[method_name]))
+        setattr(cls, method_name, wrapper)
+
+    def _add(self, name, seconds):
+        """
+        Adds one call taking seconds to the counter called name
+        """
+        counter = self._counters.get(name)
+        if counter is None:
+            counter = self._counters[name] = [0, 0.0]
+        counter[0] += 1
+        counter[1] += seconds
+
+    def _get_timer(self, method, name):
+        """
+        Returns wrapper of method counting and timing its calls under name
+        """
+        perf_counter = time.perf_counter
+
+        @wraps(method)
+        def timer(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._add(name, perf_counter() - start)
+        return timer
+
+    def _get_piece_timer(self, method, name):
+        """
+        Returns wrapper of a Board method whose first argument is a square or a packed move, timing its calls under
+        name and the type of the piece on the square (or moving), like "is_legal_move Horse"
+        """
+        perf_counter = time.perf_counter
+
+        @wraps(method)
+        def timer(board, square, *args):
+            kind = board.get_code(square & 127) & 7
+            start = perf_counter()
+            try:
+                return method(board, square, *args)
+            finally:
+                self._add(name + " " + TYPE_NAMES[kind], perf_counter() - start)
+        return timer
+
+    def _get_cache_counter(self, method):
+        """
+        Returns wrapper of LegalMoveCache.get counting hits and misses
+        """
+        @wraps(method)
+        def counter(cache, key):
+            moves = method(cache, key)
+            if moves is None:
+                self._cache_misses += 1
+            else:
+                self._cache_hits += 1
+            return moves
+        return counter
+
+    def _get_move_recorder(self, method):
+        """
+        Returns wrapper of make_move keeping the slowest calls with the position they were made in
+        """
+        perf_counter = time.perf_counter
+
+        @wraps(method)
+        def recorder(game, current_space, move_space):
+            fen = game.get_fen()
+            start = perf_counter()
+            result = method(game, current_space, move_space)
+            seconds = perf_counter() - start
+            slow_moves = self._slow_moves
+            if len(slow_moves) < self._slowest or seconds > slow_moves[-1][0]:
+                slow_moves.append((seconds, fen, current_space, move_space, result))
+                slow_moves.sort(key=lambda slow_move: slow_move[0], reverse=True)
+                del slow_moves[self._slowest:]
+            return result
+        return recorder
+
+    def get_counters(self):
+        """
+        Returns dictionary of name: {"calls": number of calls, "seconds": total time including inner calls}
+        """
+        return {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in self._counters.items()}
+
+    def get_cache_counts(self):
+        """
+        Returns (hits, misses) of legal move cache lookups while enabled
+        """
+        return self._cache_hits, self._cache_misses
+
+    def get_slowest_moves(self):
+        """
+        Returns list of the slowest make_move calls, slowest first, each a dictionary of seconds, position (FEN),
+        current space, move space and the result make_move returned
+        """
+        return [{"seconds": seconds, "position": fen, "current_space": current_space, "move_space": move_space,
+                 "result": result} for seconds, fen, current_space, move_space, result in self._slow_moves]
+
+    def get_report(self):
+        """
+        Returns every counter as a dictionary that json can write
+        """
+        return {"counters": self.get_counters(),
+                "cache": {"hits": self._cache_hits, "misses": self._cache_misses},
+                "slowest_moves": self.get_slowest_moves()}
+
+    def dump(self, path):
+        """
+        Writes the report (see get_report) as JSON to path
+        """
+        with open(path, "w") as file:
+            json.dump(self.get_report(), file, indent=2)
+
+    def print_report(self, file=None):
+        """
+        Prints the counters as a table, most time first, in the layout of the profile module's statistics
+        """
+        file = sys.stdout if file is None else file
+        print("%10s %10s %12s  %s" % ("ncalls", "cumtime", "percall (us)", "function"), file=file)
+        for name, (calls, seconds) in sorted(self._counters.items(), key=lambda item: item[1][1], reverse=True):
+            print("%10d %10.4f %12.2f  %s" % (calls, seconds, seconds / calls * 1e6, name), file=file)
+        print("legal move cache: %d hits, %d misses" % (self._cache_hits, self._cache_misses), file=file)
@@ -0,0 +1,222 @@
+# Description: Game records for Janggi, stored compactly in binary or as text using the "a1" .. "i10" spaces.
+# Readers and writers stream one record at a time, so files with millions of games never have to be loaded whole.
+#
+# Binary file: the 4 byte MAGIC, then one record after another.  A record is a 5 byte header (result, number of
+# moves, metadata length), the metadata as UTF-8 JSON, then 2 bytes per move (from square | to square << 7,
+# little-endian), a pass has the same from and to square.
+# Text file: one record per line, the result, the moves ("c7-c6") and the metadata as JSON, separated by tabs.
+
+import json
+import mmap
+import struct
+
+from JanggiGame import GAME_STATES, SPACE_NAMES, SPACE_SQUARES, JanggiGame, LegalMoveCache
+
+MAGIC = b"JGR\x01"
+_HEADER = struct.Struct("<BHH")
+
+
+class GameRecord:
+    """
+    One recorded game: its moves, its result and any metadata (players, date, event ...)
+    Moves are kept packed, from square | to square << 7, two bytes each in a binary file
+    """
+
+    def __init__(self, moves, result="UNFINISHED", metadata=None):
+        """
+        Initializes record
+        Inputs: List of packed moves or of (current space, move space) pairs, game state the game ended in,
+        dictionary of metadata (anything JSON can hold)
+        """
+        packed_moves = []
+        for move in moves:
+            if not isinstance(move, int):
+                move = SPACE_SQUARES[move[0]] | (SPACE_SQUARES[move[1]] << 7)
+            move &= 16383
+            if move & 127 >= 90 or move >> 7 >= 90:
+                raise ValueError("Move " + str(move) + " names a square off the board")
+            packed_moves.append(move)
+        if result not in GAME_STATES:
+            raise ValueError("Unknown game result " + str(result))
+        self._moves = packed_moves
+        self._result = result
+        self._metadata = dict(metadata or {})
+
+    @classmethod
+    def from_game(cls, game, metadata=None):
+        """
+        Returns record of the moves played so far in a JanggiGame and its current state
+        """
+        return cls(game.get_move_history(), game.get_game_state(), metadata)
+
+    def get_moves(self):
+        """
+        Returns list of (current space, move space) pairs, as passed to JanggiGame.make_move
+        """
+        return [(SPACE_NAMES[move & 127], SPACE_NAMES[move >> 7]) for move in self._moves]
+
+    def get_packed_moves(self):
+        """
+        Returns list of packed moves (from square | to square << 7)
+        """
+        return list(self._moves)
+
+    def get_result(self):
+        """
+        Returns game state the game ended in: UNFINISHED, RED_WON, BLUE_WON or DRAW
+        """
+        return self._result
+
+    def get_metadata(self):
+        """
+        Returns dictionary of metadata
+        """
+        return dict(self._metadata)
+
+    def replay(self, move_cache=None):
+        """
+        Returns new JanggiGame with the recorded moves played
+        Raises ValueError naming the ply of the first move make_move refuses
+        """
+        game = JanggiGame(LegalMoveCache(0) if move_cache is None else move_cache)
+        for ply, (current_space, move_space) in enumerate(self.get_moves()):
+            if not game.make_move(current_space, move_space):
+                raise ValueError("Illegal move " + current_space + "-" + move_space + " at ply " + str(ply))
+        return game
+
+    def to_bytes(self):
+        """
+        Returns the record in the binary format, header then metadata then moves
+        """
+        metadata = json.dumps(self._metadata, separators=(",", ":")).encode() if self._metadata else b""
+        if len(self._moves) > 0xFFFF or len(metadata) > 0xFFFF:
+            raise ValueError("Record has too many moves or too much metadata")
+        return (_HEADER.pack(GAME_STATES.index(self._result), len(self._moves), len(metadata)) + metadata +
+                struct.pack("<%dH" % len(self._moves), *self._moves))
+
+    def to_text(self):
+        """
+        Returns the record as one line of text (without the line end): result, moves and metadata
+        """
+        moves = " ".join(SPACE_NAMES[move & 127] + "-" + SPACE_NAMES[move >> 7] for move in self._moves)
+        metadata = json.dumps(self._metadata, separators=(",", ":")) if self._metadata else ""
+        return self._result + "\t" + moves + "\t" + metadata
+
+    @classmethod
+    def from_text(cls, line):
+        """
+        Returns record read from one line written by to_text
+        Raises ValueError, quoting the line, if the line is not a record
+        """
+        line = line.rstrip("\r\n")
+        fields = line.split("\t")
+        if len(fields) != 3:
+            raise ValueError("Record line must have a result, moves and metadata separated by tabs: " + repr(line))
+        result, moves, metadata = fields
+        spaces = [move.split("-") for move in moves.split()]
+        if any(len(move) != 2 for move in spaces):
+            raise ValueError("Record line has a move that is not two spaces joined by '-': " + repr(line))
+        try:
+            metadata = json.loads(metadata) if metadata else None
+        except ValueError:
+            raise ValueError("Record line has metadata that is not JSON: " + repr(line)) from None
+        if metadata is not None and not isinstance(metadata, dict):
+            raise ValueError("Record line has metadata that is not a JSON object: " + repr(line))
+        try:
+            return cls(spaces, result, metadata)
+        except KeyError:
+            raise ValueError("Record line has a move naming an unknown space: " + repr(line)) from None
+
+
+def _unpack_record(buffer, offset):
+    """
+    Returns (GameRecord, offset of the next record) for the binary record at offset in buffer
+    """
+    if offset + _HEADER.size > len(buffer):
+        raise ValueError("Record header cut short at byte " + str(offset))
+    result, move_count, metadata_length = _HEADER.unpack_from(buffer, offset)
+    offset += _HEADER.size
+    end = offset + metadata_length + 2 * move_count
+    if end > len(buffer) or result >= len(GAME_STATES):
+        raise ValueError("Record at byte " + str(offset - _HEADER.size) + " is damaged or cut short")
+    metadata = json.loads(bytes(buffer[offset:offset + metadata_length])) if metadata_length else None
+    moves = struct.unpack_from("<%dH" % move_count, buffer, offset + metadata_length)
+    return GameRecord(moves, GAME_STATES[result], metadata), end
+
+
+def write_records(file, records):
+    """
+    Writes records to a binary file opened for writing, MAGIC first
+    records can be a generator, each record is written as soon as it is made
+    Inputs: Binary file object, iterable of GameRecord
+    Outputs: Number of records written
+    """
+    file.write(MAGIC)
+    count = 0
+    for record in records:
+        file.write(record.to_bytes())
+        count += 1
+    return count
+
+
+def read_records(file):
+    """
+    Yields the records of a binary file opened for reading, one at a time
+    Only one record is held in memory at once
+    Inputs: Binary file object
+    Outputs: Generator of GameRecord
+    """
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a Janggi game record file")
+    while True:
+        header = file.read(_HEADER.size)
+        if not header:
+            return
+        if len(header) < _HEADER.size:
+            raise ValueError("Record header cut short")
+        move_count, metadata_length = _HEADER.unpack(header)[1:]
+        record, _ = _unpack_record(header + file.read(metadata_length + 2 * move_count), 0)
+        yield record
+
+
+def read_records_mmap(path):
+    """
+    Yields the records of a binary file by memory-mapping it
+    The operating system pages the file in as it is read, nothing is copied into memory up front
+    Inputs: Path of the binary file
+    Outputs: Generator of GameRecord
+    """
+    with open(path, "rb") as file:
+        if not file.seek(0, 2):
+            raise ValueError("Not a Janggi game record file")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if buffer[:len(MAGIC)] != MAGIC:
+                raise ValueError("Not a Janggi game record file")
+            offset = len(MAGIC)
+            while offset < len(buffer):
+                record, offset = _unpack_record(buffer, offset)
+                yield record
+
+
+def write_text_records(file, records):
+    """
+    Writes records to a text file opened for writing, one line each
+    Inputs: Text file object, iterable of GameRecord
+    Outputs: Number of records written
+    """
+    count = 0
+    for record in records:
+        file.write(record.to_text() + "\n")
+        count += 1
+    return count
+
+
+def read_text_records(file):
+    """
+    Yields the records of a text file opened for reading, one line at a time, blank lines are skipped
+    Inputs: Text file object
+    Outputs: Generator of GameRecord
+    """
+    for line in file:
+        if line.strip():
+            yield GameRecord.from_text(line)
@@ -0,0 +1,424 @@
+# Description: Asyncio game server hosting many JanggiGame sessions over a local TCP socket, and a load generator
+# to measure it.  The protocol is one JSON object per line each way.  Requests carry an "op" and an optional "id"
+# that is echoed in the reply:
+#   {"op": "new", "fen": optional position string}            -> {"ok": true, "session": id, "fen": ..., "state": ...}
+#   {"op": "move", "session": id, "from": "c7", "to": "c6"}   -> {"ok": true, "legal": true/false, "fen", "state"}
+#   {"op": "get", "session": id}                              -> {"ok": true, "fen": ..., "state": ...}
+#   {"op": "moves", "session": id}                            -> {"ok": true, "moves": [["c7", "c6"], ...]}
+#   {"op": "subscribe", "session": id}                        -> {"ok": true}, then every move played in the session
+#                                                                is pushed as {"event": "move", "session", "from",
+#                                                                "to", "fen", "state"}
+#   {"op": "close", "session": id}                            -> {"ok": true}
+# A failed request gets {"ok": false, "error": message}.  Moves are checked and played on the event loop, whether a
+# move that gives check is mate is worked out in an executor, so one slow position does not hold up other sessions.
+#
+# Usage: python JanggiServer.py serve --port=8765 --workers=4, then python JanggiServer.py load --port=8765
+
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from JanggiGame import JanggiGame, LegalMoveCache, SPACE_NAMES, SPACE_SQUARES
+
+# Pushes to a subscriber that has this many bytes waiting to be sent are dropped, along with the subscriber
+MAX_PENDING_BYTES = 1 << 20
+
+
+def _is_checkmated(packed, color):
+    """
+    Returns True if color is checkmated in the packed position (run in an executor)
+    Inputs: Position packed with JanggiGame.pack, color ("red" or "blue")
+    """
+    return JanggiGame.from_packed(packed, LegalMoveCache(0)).is_checkmated(color)
+
+
+class GameSession:
+    """
+    One game hosted by the server, its subscribers and a lock so moves on it are played one at a time
+    """
+
+    def __init__(self, session_id, game):
+        """
+        Initializes session holding game
+        """
+        self.session_id = session_id
+        self.game = game
+        self.lock = asyncio.Lock()
+        self.subscribers = set()
+
+    def get_status(self):
+        """
+        Returns dictionary of the game's position string and state
+        """
+        return {"fen": self.game.get_fen(), "state": self.game.get_game_state()}
+
+
+class JanggiServer:
+    """
+    Hosts JanggiGame sessions keyed by session id for any number of connections
+    Idle connections cost nothing but their socket: each waits on its own read, there is no polling
+    """
+
+    def __init__(self, executor=None):
+        """
+        Initializes server with no sessions
+        executor runs checkmate checks (a ProcessPoolExecutor keeps them off the interpreter running the event loop),
+        None uses the event loop's default executor
+        """
+        self._executor = executor
+        self._sessions = {}
+        self._session_ids = itertools.count(1)
+        self._server = None
+        # Task answering each open connection, by its writer
+        self._connections = {}
+        self._requests = 0
+
+    def get_session_count(self):
+        """
+        Returns number of open sessions
+        """
+        return len(self._sessions)
+
+    def get_request_count(self):
+        """
+        Returns number of requests answered
+        """
+        return self._requests
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        Starts listening on host and port (0 picks a free port)
+        Outputs: Port listened on
+        """
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """
+        Serves connections until cancelled
+        """
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """
+        Stops listening, closes every open connection and waits for their tasks to end
+        """
+        self._server.close()
+        tasks = list(self._connections.values())
+        for writer in list(self._connections):
+            writer.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def _handle_connection(self, reader, writer):
+        """
+        Answers the requests of one connection, one line at a time, until it closes
+        """
+        subscriptions = set()
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than the reader's limit: the error is sent and the connection closed, since where the
+                    # next request starts is lost.  What the client still sends is read and dropped until it
+                    # closes its side, closing with unread data would reset the connection before the error arrives
+                    writer.write(json.dumps({"ok": False, "error": "Request line too long"},
+                                            separators=(",", ":")).encode() + b"\n")
+                    writer.write_eof()
+                    await writer.drain()
+                    while await reader.read(1 << 16):
+                        pass
+                    break
+                if not line:
+                    break
+                reply = await self._handle_line(line, writer, subscriptions)
+                writer.write(json.dumps(reply, separators=(",", ":")).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for session in subscriptions:
+                session.subscribers.discard(writer)
+            del self._connections[writer]
+            writer.close()
+
+    async def _handle_line(self, line, writer, subscriptions):
+        """
+        Returns reply to one request line
+        """
+        self._requests += 1
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            request_id = request.get("id")
+            reply = await self._handle_request(request, writer, subscriptions)
+        except (ValueError, KeyError, TypeError) as error:
+            reply = {"ok": False, "error": str(error) if not isinstance(error, KeyError) else
+                     "Missing or unknown " + str(error)}
+        if request_id is not None:
+            reply["id"] = request_id
+        return reply
+
+    def _get_session(self, request):
+        """
+        Returns the session a request names
+        """
+        session = self._sessions.get(request.get("session"))
+        if session is None:
+            raise ValueError("No session " + str(request.get("session")))
+        return session
+
+    async def _handle_request(self, request, writer, subscriptions):
+        """
+        Returns reply to one parsed request
+        """
+        op = request["op"]
+        if op == "new":
+            fen = request.get("fen")
+            if fen and not isinstance(fen, str):
+                raise ValueError("fen must be a string")
+            game = JanggiGame.from_fen(fen) if fen else JanggiGame()
+            session = GameSession(str(next(self._session_ids)), game)
+            self._sessions[session.session_id] = session
+            return dict(ok=True, session=session.session_id, **session.get_status())
+        session = self._get_session(request)
+        if op == "move":
+            legal = await self.play_move(session, request["from"], request["to"])
+            return dict(ok=True, legal=legal, **session.get_status())
+        if op == "get":
+            return dict(ok=True, **session.get_status())
+        if op == "moves":
+            game = session.game
+            color = "blue" if game.get_last_turn() == "red" else "red"
+            moves = [[SPACE_NAMES[move & 127], SPACE_NAMES[(move >> 7) & 127]] for move in game.get_legal_moves(color)]
+            if game.get_game_state() != "UNFINISHED":
+                moves = []
+            return {"ok": True, "moves": moves}
+        if op == "subscribe":
+            session.subscribers.add(writer)
+            subscriptions.add(session)
+            return {"ok": True}
+        if op == "close":
+            del self._sessions[session.session_id]
+            return {"ok": True}
+        raise ValueError("Unknown op " + str(op))
+
+    async def play_move(self, session, current_space, move_space):
+        """
+        Plays a move in a session with the rules of JanggiGame.make_move and pushes it to subscribers
+        The move is checked with JanggiGame.find_move on the event loop, if it gives check the checkmate test runs
+        in the executor on the packed position after the move.  The move is only played, and the game state set,
+        once that test is done, so the session never shows the move without its state and a failed test leaves
+        the game as it was
+        Outputs: True if the move was legal and played, False if not
+        """
+        if current_space not in SPACE_SQUARES or move_space not in SPACE_SQUARES:
+            raise ValueError("Unknown space")
+        async with session.lock:
+            game = session.game
+            move = game.find_move(current_space, move_space)
+            if move is None:
+                return False
+            opponent = game.get_last_turn()
+            # The move is played and taken back at once, nothing else runs on the loop in between
+            game.push(move)
+            packed = game.pack() if game.is_in_check(opponent) else None
+            game.pop()
+            checkmated = False
+            if packed is not None:
+                loop = asyncio.get_running_loop()
+                try:
+                    checkmated = await loop.run_in_executor(self._executor, _is_checkmated, packed, opponent)
+                except Exception as error:
+                    # Answered as a failed request, like any other error in it
+                    raise ValueError("Checkmate test failed: " + str(error)) from error
+            generals_facing = game.is_bikjang()
+            game.push(move)
+            game.update_state(generals_facing, checkmated)
+            self._publish(session, current_space, move_space)
+            return True
+
+    def _publish(self, session, current_space, move_space):
+        """
+        Pushes a move played in a session to its subscribers
+        Subscribers that are not reading are dropped rather than letting their unsent pushes pile up
+        """
+        if not session.subscribers:
+            return
+        event = dict(event="move", session=session.session_id, **session.get_status())
+        event["from"] = current_space
+        event["to"] = move_space
+        line = json.dumps(event, separators=(",", ":")).encode() + b"\n"
+        for writer in list(session.subscribers):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > MAX_PENDING_BYTES:
+                session.subscribers.discard(writer)
+                continue
+            writer.write(line)
+
+
+class JanggiClient:
+    """
+    Connection to a JanggiServer sending one request at a time
+    """
+
+    def __init__(self, reader, writer):
+        """
+        Initializes client on an open connection (see connect)
+        """
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._events = []
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8765):
+        """
+        Returns client connected to the server at host and port
+        """
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, op, **fields):
+        """
+        Returns the server's reply to a request, keeping any pushed events that arrive before it
+        Inputs: Request op and its fields
+        Outputs: Reply dictionary
+        """
+        request_id = next(self._ids)
+        fields.update(op=op, id=request_id)
+        self._writer.write(json.dumps(fields, separators=(",", ":")).encode() + b"\n")
+        await self._writer.drain()
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                raise ConnectionError("Server closed the connection")
+            message = json.loads(line)
+            if "event" in message:
+                self._events.append(message)
+            elif message.get("id") == request_id:
+                return message
+
+    async def next_event(self):
+        """
+        Returns the next event pushed by the server, waiting for one if none has arrived
+        """
+        if self._events:
+            return self._events.pop(0)
+        while True:
+            message = json.loads(await self._reader.readline())
+            if "event" in message:
+                return message
+
+    async def close(self):
+        """
+        Closes the connection
+        """
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def run_load(host="127.0.0.1", port=8765, clients=50, games=4, plies=40, idle=0, seed=0):
+    """
+    Plays games against a server from many clients at once and measures request latency
+    Each client plays its games with random legal moves (asking the server for them), idle connections are opened
+    first and left waiting to show they do not slow the busy ones
+    Inputs: Server host and port, number of playing clients, games per client, plies per game, idle connections,
+    random seed
+    Outputs: Dictionary of requests, seconds, requests per second and latency percentiles in milliseconds
+    """
+    idle_connections = [await asyncio.open_connection(host, port) for _ in range(idle)]
+    latencies = []
+
+    async def play(client_number):
+        generator = random.Random(seed * 100003 + client_number)
+        client = await JanggiClient.connect(host, port)
+        try:
+            for _ in range(games):
+                start = time.perf_counter()
+                session = (await client.request("new"))["session"]
+                latencies.append(time.perf_counter() - start)
+                for _ in range(plies):
+                    start = time.perf_counter()
+                    moves = (await client.request("moves", session=session))["moves"]
+                    latencies.append(time.perf_counter() - start)
+                    if not moves:
+                        break
+                    current_space, move_space = generator.choice(moves)
+                    start = time.perf_counter()
+                    await client.request("move", session=session, **{"from": current_space, "to": move_space})
+                    latencies.append(time.perf_counter() - start)
+                await client.request("close", session=session)
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(play(client_number) for client_number in range(clients)))
+    seconds = time.perf_counter() - start
+    for _, writer in idle_connections:
+        writer.close()
+    latencies.sort()
+
+    def percentile(fraction):
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000 if latencies else 0.0
+
+    return {"requests": len(latencies), "seconds": seconds, "requests_per_second": len(latencies) / seconds,
+            "p50_ms": percentile(0.5), "p99_ms": percentile(0.99), "max_ms": percentile(1.0)}
+
+
+async def _serve(port, workers):
+    """
+    Runs a server on port until interrupted
+    """
+    executor = ProcessPoolExecutor(workers) if workers else None
+    server = JanggiServer(executor)
+    port = await server.start("127.0.0.1", port)
+    print("serving on port", port)
+    try:
+        await server.serve_forever()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def main(args):
+    """
+    Runs the server (serve) or the load generator (load) from the command line
+    Options: --port=N, serve: --workers=N processes for checkmate checks, load: --clients=N --games=N --plies=N
+    --idle=N
+    Outputs: 0 on success, 1 for a bad command
+    """
+    options = {"port": 8765, "workers": 0, "clients": 50, "games": 4, "plies": 40, "idle": 0}
+    for arg in args[1:]:
+        name, _, value = arg.lstrip("-").partition("=")
+        if name not in options:
+            print("Unknown option " + arg)
+            return 1
+        options[name] = int(value)
+    if args[:1] == ["serve"]:
+        try:
+            asyncio.run(_serve(options["port"], options["workers"]))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if args[:1] == ["load"]:
+        result = asyncio.run(run_load("127.0.0.1", options["port"], options["clients"], options["games"],
+                                      options["plies"], options["idle"]))
+        print("%(requests)d requests in %(seconds).3fs, %(requests_per_second).0f requests/s, "
+              "p50 %(p50_ms).2fms p99 %(p99_ms).2fms max %(max_ms).2fms" % result)
+        return 0
+    print("usage: JanggiServer.py serve|load [--port=N] [--workers=N] [--clients=N] [--games=N] [--plies=N] "
+          "[--idle=N]")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
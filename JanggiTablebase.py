@@ -0,0 +1,496 @@
+# Description: Endgame tablebases for Janggi positions with few pieces.  generate_tablebase solves every placement of
+# a small set of pieces (both Generals plus a few others) by retrograde analysis: checkmates are losses in 0, a
+# position with a move to a loss is a win one ply longer, and a position whose every move (passing included) leads to
+# a win for the opponent is a loss.  Whatever is left once nothing changes is a draw.  The move graph is built by
+# worker processes, positions after a capture are looked up in the tablebase of the smaller piece set.
+#
+# File: the 4 byte MAGIC, the material name length (1 byte) and name, the number of positions (4 bytes), then one
+# byte per position: 0 draw, 255 not a legal position, otherwise distance to mate in plies + 1 (odd distance: the
+# side to move wins, even: it loses).
+#
+# Usage: generate_tablebase("KRka", "tables/") then TablebaseSet("tables/").probe(game), or from the command line
+# python JanggiTablebase.py KRka tables/ --workers=4
+# Table sizes: 14580 positions with one piece besides the Generals, then 90 times more for each further piece (9 times
+# for a Guard), so tables of more than two pieces besides the Generals are out of reach.
+
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from JanggiGame import Board, RED, BLUE, GENERAL, GUARD, FEN_LETTERS, FEN_CODES, get_piece_code, get_square
+
+MAGIC = b"JTB\x01"
+WIN = "WIN"
+DRAW = "DRAW"
+LOSS = "LOSS"
+
+_DRAW_BYTE = 0
+_INVALID_BYTE = 255
+# Longest distance to mate a one byte entry can hold
+MAX_DISTANCE = 253
+
+# Squares of each color's fortress, where its General and Guards have to be
+_PALACE_SQUARES = ([get_square(column, row) for row in range(3) for column in range(3, 6)],
+                   [get_square(column, row) for row in range(7, 10) for column in range(3, 6)])
+_ALL_SQUARES = list(range(90))
+
+
+def parse_material(name):
+    """
+    Returns the pieces of a material name other than the Generals, in table order
+    A name is "K", blue's other pieces (upper case FEN letters), "k", red's other pieces (lower case),
+    e.g. "KRk" is blue General and Chariot against red General
+    Inputs: Material name
+    Outputs: Tuple of (color, type) pairs, blue's pieces first, each color sorted by type
+    """
+    if not name.startswith("K") or name.count("k") != 1:
+        raise ValueError("Material name must be K, blue pieces, k, red pieces, like KRka")
+    blue, red = name[1:].split("k")
+    pieces = []
+    for color, letters, upper in ((BLUE, blue, True), (RED, red, False)):
+        kinds = []
+        for letter in letters:
+            if letter.isupper() != upper or letter.lower() not in FEN_CODES or letter.lower() == "k":
+                raise ValueError("Unknown piece " + letter + " in material name " + name)
+            kinds.append(FEN_CODES[letter.lower()])
+        pieces.extend((color, kind) for kind in sorted(kinds))
+    return tuple(pieces)
+
+
+def get_material_name(pieces):
+    """
+    Returns material name of pieces (see parse_material)
+    Inputs: Iterable of (color, type) pairs other than the Generals
+    """
+    blue = "".join(FEN_LETTERS[kind].upper() for kind in sorted(kind for color, kind in pieces if color == BLUE))
+    red = "".join(FEN_LETTERS[kind] for kind in sorted(kind for color, kind in pieces if color == RED))
+    return "K" + blue + "k" + red
+
+
+def _get_domains(pieces):
+    """
+    Returns the squares each piece of a table may stand on, red General and blue General first
+    Generals and Guards stay inside their fortress, other pieces may be anywhere
+    """
+    domains = [_PALACE_SQUARES[RED], _PALACE_SQUARES[BLUE]]
+    for color, kind in pieces:
+        domains.append(_PALACE_SQUARES[color] if kind == GUARD else _ALL_SQUARES)
+    return domains
+
+
+def _get_table_size(pieces):
+    """
+    Returns number of indexes of a table: every square of every piece times the color to move
+    """
+    size = 2
+    for domain in _get_domains(pieces):
+        size *= len(domain)
+    return size
+
+
+class _Indexer:
+    """
+    Turns piece squares and color to move into a table index and back
+    index = (((red General * size + blue General) * size + piece 1) ...) * 2 + color to move
+    """
+
+    def __init__(self, pieces):
+        """
+        Initializes indexer for the pieces of a table (Generals not included)
+        """
+        self._codes = [get_piece_code(RED, GENERAL), get_piece_code(BLUE, GENERAL)] + \
+            [get_piece_code(color, kind) for color, kind in pieces]
+        self._domains = _get_domains(pieces)
+        self._positions = [{square: place for place, square in enumerate(domain)} for domain in self._domains]
+        self.size = _get_table_size(pieces)
+
+    def get_codes(self):
+        """
+        Returns piece code of each slot, red General and blue General first
+        """
+        return self._codes
+
+    def get_index(self, squares, color):
+        """
+        Returns index of the piece squares (one per slot) with color to move, None if a piece is off its domain
+        """
+        index = 0
+        for positions, square in zip(self._positions, squares):
+            place = positions.get(square)
+            if place is None:
+                return None
+            index = index * len(positions) + place
+        return index * 2 + color
+
+    def get_squares(self, index):
+        """
+        Returns (list of piece squares by slot, color to move) of an index
+        """
+        color = index & 1
+        index >>= 1
+        squares = []
+        for domain in reversed(self._domains):
+            index, place = divmod(index, len(domain))
+            squares.append(domain[place])
+        squares.reverse()
+        return squares, color
+
+
+def _sort_slots(codes, squares):
+    """
+    Returns slot squares sorted into table order: pieces of the same code in increasing square order
+    Outputs: List of squares, a canonical order so positions with two identical pieces have one index
+    """
+    result = list(squares)
+    start = 2
+    while start < len(codes):
+        end = start
+        while end < len(codes) and codes[end] == codes[start]:
+            end += 1
+        result[start:end] = sorted(result[start:end])
+        start = end
+    return result
+
+
+def _build_moves(pieces, start, end):
+    """
+    Builds the move graph of table indexes start to end (run in worker processes)
+    A move is legal when the position it leads to is, which generate_tablebase checks once every flag is known,
+    so moves are listed without being played
+    Outputs: (bytearray of flags per index: 0 not legal, 1 legal, 2 legal and in check,
+    offsets into children, array of child indexes in this table,
+    list of (index, piece captured, child squares, child color to move) for moves into smaller tables)
+    """
+    indexer = _Indexer(pieces)
+    codes = indexer.get_codes()
+    flags = bytearray(end - start)
+    offsets = array("I", [0])
+    children = array("I")
+    captures = []
+    for index in range(start, end):
+        squares, color = indexer.get_squares(index)
+        if len(set(squares)) < len(squares) or _sort_slots(codes, squares) != squares:
+            offsets.append(len(children))
+            continue
+        board = Board()
+        for slot, square in enumerate(squares):
+            board.put(square, codes[slot])
+        opponent = 1 - color
+        if board.is_attacked(board.get_general(opponent), color):
+            offsets.append(len(children))
+            continue
+        general = board.get_general(color)
+        in_check = board.is_attacked(general, opponent)
+        flags[index - start] = 2 if in_check else 1
+        slots = {square: slot for slot, square in enumerate(squares)}
+        for move in board.generate_moves(color):
+            from_square = move & 127
+            to_square = (move >> 7) & 127
+            child_squares = list(squares)
+            child_squares[slots[from_square]] = to_square
+            if move >> 14:
+                slot = slots[to_square]
+                del child_squares[slot]
+                child_codes = codes[:slot] + codes[slot + 1:]
+                child_squares = _sort_slots(child_codes, child_squares)
+                captures.append((index, slot - 2, child_squares, opponent))
+            else:
+                child_squares = _sort_slots(codes, child_squares)
+                children.append(indexer.get_index(child_squares, opponent))
+        if not in_check:
+            children.append(index ^ 1)
+        offsets.append(len(children))
+    return flags, offsets, children, captures
+
+
+def _solve(size, flags, offsets, children, capture_results):
+    """
+    Returns one byte per index from the move graph by retrograde analysis
+    Positions are settled in order of distance to mate, so each gets its shortest win or longest loss
+    Inputs: Table size, legal / in check flags, child offsets and indexes, list of (index, value byte of
+    the position after a capture) for moves into smaller tables
+    Outputs: bytearray of table entries
+    """
+    # Parents of each index, in the same offset layout as children
+    parent_counts = array("I", [0]) * (size + 1)
+    for child in children:
+        parent_counts[child + 1] += 1
+    for index in range(size):
+        parent_counts[index + 1] += parent_counts[index]
+    parent_offsets = array("I", parent_counts)
+    parents = array("I", [0]) * len(children)
+    fill = array("I", parent_counts)
+    for index in range(size):
+        for child in children[offsets[index]:offsets[index + 1]]:
+            parents[fill[child]] = index
+            fill[child] += 1
+
+    remaining = array("I", [0]) * size
+    values = bytearray([_INVALID_BYTE]) * size
+    # Events by distance: (index, distance) settled positions, or moves into smaller tables to count
+    settled = [[] for _ in range(MAX_DISTANCE + 2)]
+    capture_events = [[] for _ in range(MAX_DISTANCE + 2)]
+    for index in range(size):
+        if not flags[index]:
+            continue
+        values[index] = _DRAW_BYTE
+        remaining[index] = offsets[index + 1] - offsets[index]
+    for index, value in capture_results:
+        remaining[index] += 1
+        if value != _DRAW_BYTE:
+            capture_events[value - 1].append((index, value - 1))
+    for index in range(size):
+        if flags[index] == 2 and remaining[index] == 0:
+            settled[0].append(index)
+
+    done = bytearray(size)
+    for distance in range(MAX_DISTANCE + 1):
+        newly_settled = []
+        for index in settled[distance]:
+            if not done[index]:
+                done[index] = 1
+                values[index] = distance + 1
+                newly_settled.append(index)
+        # A move to a position lost for the opponent wins, a move to one won for the opponent is one fewer way out
+        for index, child_distance in capture_events[distance]:
+            if done[index]:
+                continue
+            if child_distance % 2 == 0:
+                settled[distance + 1].append(index)
+            else:
+                remaining[index] -= 1
+                if remaining[index] == 0:
+                    settled[distance + 1].append(index)
+        for child in newly_settled:
+            for parent in parents[parent_offsets[child]:parent_offsets[child + 1]]:
+                if done[parent]:
+                    continue
+                if distance % 2 == 0:
+                    settled[distance + 1].append(parent)
+                else:
+                    remaining[parent] -= 1
+                    if remaining[parent] == 0:
+                        settled[distance + 1].append(parent)
+    if settled[MAX_DISTANCE + 1]:
+        raise ValueError("Distance to mate is longer than a tablebase entry can hold")
+    return values
+
+
+def generate_tablebase(name, directory, workers=0, chunk_size=4096, tables=None):
+    """
+    Generates the tablebase of a material name (see parse_material) and writes it to directory as name + ".jtb"
+    Tablebases of the smaller piece sets reached by captures are generated first, unless already in directory
+    With workers, the move graph is built by that many processes
+    Inputs: Material name, directory for table files, number of worker processes (0 for none), indexes per
+    job, dictionary of already loaded tables by name (filled in as tables are made)
+    Outputs: bytearray of the table entries
+    """
+    pieces = parse_material(name)
+    name = get_material_name(pieces)
+    tables = {} if tables is None else tables
+    if name in tables:
+        return tables[name]
+    path = os.path.join(directory, name + ".jtb")
+    if os.path.exists(path):
+        table = Tablebase(path)
+        tables[name] = table.get_values()
+        table.close()
+        return tables[name]
+
+    size = _get_table_size(pieces)
+    jobs = [(pieces, start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+    if workers:
+        with ProcessPoolExecutor(workers) as executor:
+            parts = list(executor.map(_build_moves, *zip(*jobs)))
+    else:
+        parts = [_build_moves(*job) for job in jobs]
+
+    flags = bytearray()
+    for part in parts:
+        flags.extend(part[0])
+    # Keep only the moves to legal positions: the moving side's General is not left in check
+    offsets = array("I", [0])
+    children = array("I")
+    capture_results = []
+    indexers = {}
+    for part_flags, part_offsets, part_children, part_captures in parts:
+        for start, end in zip(part_offsets, part_offsets[1:]):
+            children.extend(child for child in part_children[start:end] if flags[child])
+            offsets.append(len(children))
+        for index, slot, child_squares, child_color in part_captures:
+            child_pieces = pieces[:slot] + pieces[slot + 1:]
+            if child_pieces:
+                child_values = generate_tablebase(get_material_name(child_pieces), directory, workers, chunk_size,
+                                                  tables)
+                if child_pieces not in indexers:
+                    indexers[child_pieces] = _Indexer(child_pieces)
+                child_value = child_values[indexers[child_pieces].get_index(child_squares, child_color)]
+                if child_value != _INVALID_BYTE:
+                    capture_results.append((index, child_value))
+            else:
+                # Two Generals alone can never mate
+                capture_results.append((index, _DRAW_BYTE))
+
+    values = _solve(size, flags, offsets, children, capture_results)
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(MAGIC + struct.pack("<B", len(name)) + name.encode() + struct.pack("<I", size))
+        file.write(values)
+    tables[name] = values
+    return values
+
+
+class Tablebase:
+    """
+    One tablebase file, memory-mapped
+    """
+
+    def __init__(self, path):
+        """
+        Opens the tablebase file at path
+        """
+        with open(path, "rb") as file:
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._buffer[:len(MAGIC)] != MAGIC:
+            self._buffer.close()
+            raise ValueError("Not a Janggi tablebase file")
+        name_length = self._buffer[len(MAGIC)]
+        self._name = self._buffer[len(MAGIC) + 1:len(MAGIC) + 1 + name_length].decode()
+        self._offset = len(MAGIC) + 1 + name_length + 4
+        self._pieces = parse_material(self._name)
+        self._indexer = _Indexer(self._pieces)
+        size = struct.unpack_from("<I", self._buffer, self._offset - 4)[0]
+        if size != self._indexer.size or len(self._buffer) != self._offset + size:
+            self._buffer.close()
+            raise ValueError("Tablebase file " + path + " is damaged")
+
+    def get_name(self):
+        """
+        Returns material name of the table
+        """
+        return self._name
+
+    def get_values(self):
+        """
+        Returns copy of all table entries
+        """
+        return bytearray(self._buffer[self._offset:])
+
+    def probe_squares(self, squares, color):
+        """
+        Returns (WIN, LOSS or DRAW for color to move, distance to mate in plies) of a position of this table
+        Inputs: Piece squares by slot (red General, blue General, then the table's pieces), color to move
+        Outputs: (result, distance) or None if the position is not a legal one
+        """
+        index = self._indexer.get_index(_sort_slots(self._indexer.get_codes(), squares), color)
+        if index is None:
+            return None
+        value = self._buffer[self._offset + index]
+        if value == _INVALID_BYTE:
+            return None
+        if value == _DRAW_BYTE:
+            return DRAW, 0
+        return (WIN if (value - 1) % 2 else LOSS), value - 1
+
+    def close(self):
+        """
+        Closes the tablebase file
+        """
+        self._buffer.close()
+
+
+class TablebaseSet:
+    """
+    Every tablebase file in a directory, probed by the material of a position
+    Positions with the colors the other way round are probed by turning the board over
+    """
+
+    def __init__(self, directory):
+        """
+        Opens every .jtb file in directory
+        """
+        self._tables = {}
+        for file_name in sorted(os.listdir(directory)):
+            if file_name.endswith(".jtb"):
+                table = Tablebase(os.path.join(directory, file_name))
+                self._tables[table.get_name()] = table
+        self._max_pieces = max([len(parse_material(name)) + 2 for name in self._tables] or [0])
+
+    def get_max_pieces(self):
+        """
+        Returns most pieces (Generals included) of any table in the set
+        """
+        return self._max_pieces
+
+    def probe_board(self, board, color):
+        """
+        Returns (WIN, LOSS or DRAW for color to move, distance to mate in plies) of a Board position
+        Outputs: (result, distance) or None if no table has the position's material
+        """
+        squares = board.get_squares(RED) + board.get_squares(BLUE)
+        if len(squares) > self._max_pieces:
+            return None
+        generals = [board.get_general(RED), board.get_general(BLUE)]
+        others = [(code >> 3, code & 7, square) for square in squares
+                  for code in (board.get_code(square),) if code & 7 != GENERAL]
+        for flipped in (0, 1):
+            if flipped:
+                # Turn the board over: rows reversed and colors swapped, so red's pieces play blue's part
+                generals = [get_square(square % 9, 9 - square // 9) for square in reversed(generals)]
+                others = [(1 - color, kind, get_square(square % 9, 9 - square // 9)) for color, kind, square in others]
+            table = self._tables.get(get_material_name([(color, kind) for color, kind, square in others]))
+            if table is not None:
+                others.sort(key=lambda piece: (piece[0] == RED, piece[1]))
+                return table.probe_squares(generals + [square for color, kind, square in others], color ^ flipped)
+        return None
+
+    def probe(self, game):
+        """
+        Returns (WIN, LOSS or DRAW for the side to move, distance to mate in plies) of a JanggiGame position
+        Outputs: (result, distance) or None if no table has the position's material
+        """
+        return self.probe_board(game.get_position(), BLUE if game.get_last_turn() == "red" else RED)
+
+    def close(self):
+        """
+        Closes every tablebase file
+        """
+        for table in self._tables.values():
+            table.close()
+
+
+def main(args):
+    """
+    Generates tablebases from the command line: material names, then the directory, --workers=N for processes
+    Outputs: 0 when every table was written
+    """
+    workers = 0
+    values = []
+    for arg in args:
+        if arg.startswith("--workers="):
+            workers = int(arg[len("--workers="):])
+        else:
+            values.append(arg)
+    if len(values) < 2:
+        print("usage: JanggiTablebase.py MATERIAL [MATERIAL ...] DIRECTORY [--workers=N]")
+        return 1
+    tables = {}
+    for name in values[:-1]:
+        start = time.perf_counter()
+        entries = generate_tablebase(name, values[-1], workers, tables=tables)
+        counts = [0, 0, 0]
+        for value in entries:
+            if value != _INVALID_BYTE:
+                counts[0 if value == _DRAW_BYTE else 1 + (value - 1) % 2] += 1
+        print("%-8s %9d positions %9d wins %9d losses %9d draws %8.3fs" % (
+            get_material_name(parse_material(name)), sum(counts), counts[2], counts[1], counts[0],
+            time.perf_counter() - start))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
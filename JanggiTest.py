@@ -1,15 +1,605 @@
+import asyncio
+import copy
+import io
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
 import unittest
-from JanggiGame import Board, JanggiGame, Pieces
+from concurrent.futures import ThreadPoolExecutor
+from JanggiGame import Board, JanggiGame, Pieces, get_square, get_piece_code, encode_move, get_move_from, \
+    get_move_to, get_move_captured, get_move_notation, get_letter_to_num, _ZOBRIST_RED_TO_MOVE, \
+    LegalMoveCache, Cannons, Soldiers, HORSE_MOVES, ELEPHANT_MOVES, PALACE_MOVES, RED, BLUE, CHARIOT, CANNON, \
+    GENERAL, GUARD, SOLDIER, PIECE_VALUES, get_start_fen, get_piece
+from JanggiBatch import validate_games
+from JanggiBook import build_book, OpeningBook
+from JanggiEngine import JanggiEngine, best_move, MATE_BOUND
+from JanggiParallel import ParallelEngine, SharedTranspositionTable, ROOT_SPLIT, LAZY_SMP
+from JanggiRecord import GameRecord, write_records, read_records, read_records_mmap, \
+    write_text_records, read_text_records
+from JanggiProfile import Profiler
+from JanggiServer import JanggiServer, JanggiClient, run_load
+from JanggiPerft import PERFT_POSITIONS, perft, divide, get_perft_position
+from JanggiTablebase import generate_tablebase, parse_material, TablebaseSet, WIN, LOSS, DRAW
 
+# A game blue wins, the last move (a3-f3) checkmates red
+MATE_MOVES = [("e7", "f7"), ("a4", "b4"), ("i10", "i8"), ("a1", "a7"), ("a10", "a7"), ("f1", "e1"), ("a7", "a2"),
+              ("e2", "f1"), ("a2", "a3"), ("b3", "b5"), ("a3", "f3")]
 
 class MyTestCase(unittest.TestCase):
-    def test_something(self):
-        self.assertEqual(True, False)
+    def test_get_item_from_board(self):
+        game = JanggiGame()
+        self.assertIsInstance(game.get_item_from_board(0, 0), Pieces)
+        self.assertEqual(game.get_item_from_board(0, 0).get_name(), "RCh1")
+        self.assertEqual(game.get_item_from_board(2, 1), "")
 
     def test_get_board(self):
+        board = Board.from_rows(JanggiGame().get_board())
+        self.assertEqual(board.get_code(get_square(0, 0)), get_piece_code(RED, CHARIOT))
+        self.assertEqual(board.get_code(get_square(2, 1)), 0)
+        self.assertEqual(board.get_general(BLUE), get_square(4, 8))
+        self.assertEqual(len(board.get_squares(RED)), 16)
+
+    def test_board_move_and_capture(self):
         board = Board()
-        self.assertEqual(board.get_item_from_board(2, 1), 2)
+        board.put(get_square(0, 0), get_piece_code(RED, CHARIOT))
+        board.put(get_square(0, 6), get_piece_code(BLUE, GENERAL))
+        self.assertIn(get_square(0, 6), board.get_targets(get_square(0, 0)))
+        self.assertTrue(board.is_attacked(get_square(0, 6), RED))
+        captured = board.move(get_square(0, 0), get_square(0, 6))
+        self.assertEqual(captured, get_piece_code(BLUE, GENERAL))
+        self.assertEqual(board.get_general(BLUE), -1)
+        self.assertEqual(board.get_squares(BLUE), [])
+
+    def test_attack_map_follows_moves(self):
+        game = JanggiGame()
+        for current_space, move_space in [("c7", "c6"), ("c4", "c5"), ("c6", "c5"), ("e4", "e5"),
+                                          ("e7", "e6"), ("e5", "e6")]:
+            self.assertTrue(game.make_move(current_space, move_space))
+        rebuilt = Board.from_rows(game.get_board())
+        for square in range(90):
+            for color in (RED, BLUE):
+                self.assertEqual(game._position.get_attack_count(square, color),
+                                 rebuilt.get_attack_count(square, color))
+
+    def test_push_pop(self):
+        game = JanggiGame()
+        start = [[item if item == "" else item.get_name() for item in row] for row in game.get_board()]
+        for current_space, move_space in [("c7", "c6"), ("c4", "c5"), ("c6", "c5"), ("e2", "e2"), ("a10", "a8")]:
+            self.assertTrue(game.make_move(current_space, move_space))
+        self.assertEqual(len(game.get_move_history()), 5)
+        self.assertEqual(game.get_item_from_board(2, 4).get_name(), "BSo2")
+        while game.get_move_history():
+            game.pop()
+        self.assertEqual([[item if item == "" else item.get_name() for item in row] for row in game.get_board()],
+                         start)
+        self.assertEqual(game.get_last_turn(), "red")
+        rebuilt = Board.from_rows(game.get_board())
+        for square in range(90):
+            self.assertEqual(game._position.get_attack_count(square, BLUE), rebuilt.get_attack_count(square, BLUE))
+
+    def test_hash(self):
+        first = JanggiGame()
+        second = JanggiGame()
+        start_hash = first.get_hash()
+        for current_space, move_space in [("c7", "c6"), ("c4", "c5"), ("e7", "e6")]:
+            first.make_move(current_space, move_space)
+        for current_space, move_space in [("e7", "e6"), ("c4", "c5"), ("c7", "c6")]:
+            second.make_move(current_space, move_space)
+        self.assertEqual(first.get_hash(), second.get_hash())
+        self.assertEqual(first.get_hash(), first._position.compute_hash() ^ _ZOBRIST_RED_TO_MOVE)
+        first.make_move("e2", "e2")
+        self.assertNotEqual(first.get_hash(), second.get_hash())
+        first.pop()
+        self.assertEqual(first.get_hash(), second.get_hash())
+        while first.get_move_history():
+            first.pop()
+        self.assertEqual(first.get_hash(), start_hash)
+
+    def test_legal_move_cache(self):
+        cache = LegalMoveCache(max_size=2)
+        first = JanggiGame(move_cache=cache)
+        second = JanggiGame(move_cache=cache)
+        moves = first.get_legal_moves("blue")
+        self.assertEqual((cache.get_hits(), cache.get_misses()), (0, 1))
+        self.assertEqual(second.get_legal_moves("blue"), moves)
+        self.assertEqual((cache.get_hits(), cache.get_misses()), (1, 1))
+        self.assertFalse(second.make_move("c1", "d3"))
+        self.assertFalse(second.make_move("c7", "c5"))
+        self.assertTrue(second.make_move("c7", "c6"))
+        self.assertEqual(cache.get_hits(), 3)
+        second.get_legal_moves("red")
+        second.get_legal_moves("blue")
+        self.assertEqual(cache.get_size(), 2)
+        self.assertIsNone(cache.get((first.get_hash(), BLUE)))
+
+    def test_move_tables(self):
+        self.assertEqual(len(HORSE_MOVES[get_square(0, 0)]), 2)
+        self.assertEqual(len(HORSE_MOVES[get_square(4, 4)]), 8)
+        self.assertEqual(len(ELEPHANT_MOVES[get_square(4, 4)]), 8)
+        self.assertEqual(sorted(PALACE_MOVES[get_square(4, 1)]),
+                         [get_square(column, row) for row in range(3) for column in range(3, 6) if (column, row) != (4, 1)])
+        self.assertEqual(sorted(PALACE_MOVES[get_square(3, 8)]), [get_square(3, 7), get_square(4, 8), get_square(3, 9)])
+        self.assertEqual(PALACE_MOVES[get_square(0, 0)], ())
+        board = JanggiGame().get_board()
+        self.assertEqual(sorted(board[0][1].get_legal_move(1, 0, board)), ["d4"])
+        self.assertEqual(sorted(board[0][2].get_legal_move(2, 0, board)), ["d3"])
+
+    def test_cannon_moves(self):
+        board = Board()
+        cannon = get_square(1, 2)
+        board.put(cannon, get_piece_code(RED, CANNON))
+        board.put(get_square(1, 4), get_piece_code(RED, SOLDIER))
+        board.put(get_square(1, 7), get_piece_code(BLUE, CHARIOT))
+        board.put(get_square(4, 2), get_piece_code(BLUE, CANNON))
+        self.assertEqual(sorted(board.get_targets(cannon)),
+                         [get_square(1, 5), get_square(1, 6), get_square(1, 7)])
+        board.remove(get_square(1, 4))
+        board.put(get_square(1, 4), get_piece_code(BLUE, CANNON))
+        self.assertEqual(board.get_targets(cannon), [])
+        rows = [[""] * 9 for _ in range(10)]
+        rows[2][1] = Cannons("RCa1", "b3", "red", "Cannon")
+        rows[2][3] = Soldiers("RSo1", "d3", "red", "Soldier")
+        rows[2][6] = Soldiers("RSo2", "g3", "red", "Soldier")
+        self.assertEqual(rows[2][1].get_legal_move(1, 2, rows), ["e3", "f3"])
+        rows[0][0] = rows[0][1] = rows[0][2] = rows[2][3]
+        self.assertEqual(rows[0][1].get_legal_move(1, 0, rows), ["b2"])
+
+    def test_make_move(self):
+        game = JanggiGame()
+        self.assertFalse(game.make_move("c1", "d3"))
+        self.assertTrue(game.make_move("c7", "c6"))
+        self.assertTrue(game.make_move("c1", "d3"))
+        self.assertEqual(game.get_item_from_board(3, 2).get_name(), "RHo1")
+        self.assertFalse(game.make_move("b10", "b9"))
+
+    def test_checkmate(self):
+        game = JanggiGame()
+        for current_space, move_space in MATE_MOVES[:-1]:
+            self.assertTrue(game.make_move(current_space, move_space))
+        self.assertFalse(game.is_checkmated("red"))
+        self.assertTrue(game.make_move("a3", "f3"))
+        self.assertTrue(game.is_in_check("red"))
+        self.assertTrue(game.is_checkmated("red"))
+        self.assertFalse(game.is_checkmated("blue"))
+        self.assertEqual(game.get_game_state(), "BLUE_WON")
+        self.assertEqual(game.get_legal_moves("red"), [])
+        self.assertFalse(game.make_move("f1", "e2"))
+
+    def test_packed_moves(self):
+        move = encode_move(get_square(0, 0), get_square(0, 6), get_piece_code(BLUE, SOLDIER))
+        self.assertEqual(get_move_from(move), 0)
+        self.assertEqual(get_move_to(move), 54)
+        self.assertEqual(get_move_captured(move), get_piece_code(BLUE, SOLDIER))
+        self.assertEqual(get_move_notation(move), ("a1", "a7"))
+
+    def test_get_legal_moves(self):
+        game = JanggiGame()
+        moves = [get_move_notation(move) for move in game.get_legal_moves("blue")]
+        self.assertEqual(len(moves), 31)
+        self.assertIn(("c7", "c6"), moves)
+        board = game.get_board()
+        for current_space, move_space in moves:
+            column = get_letter_to_num(current_space[0])
+            row = int(current_space[1:]) - 1
+            self.assertIn(move_space, board[row][column].get_legal_move(column, row, board))
+
+    def test_perft(self):
+        for name, (moves, expected_counts) in PERFT_POSITIONS.items():
+            game = get_perft_position(name)
+            start_hash = game.get_hash()
+            for depth in (1, 2):
+                self.assertEqual(perft(game, depth), expected_counts[depth], name)
+            self.assertEqual(game.get_hash(), start_hash)
+        game = get_perft_position("check")
+        counts = divide(game, 2)
+        self.assertEqual(len(counts), 7)
+        self.assertEqual(sum(nodes for move, nodes in counts), PERFT_POSITIONS["check"][1][2])
+        self.assertNotIn(("e2", "e2"), [move for move, nodes in counts])
+        self.assertEqual(perft(get_perft_position("start"), 2, passes=False), 31 * 31)
+
+    def test_evaluate(self):
+        game = JanggiGame()
+        position = game.get_position()
+        self.assertEqual(position.evaluate(RED), 0)
+        for current_space, move_space in [("c7", "c6"), ("c4", "c5"), ("c6", "c5")]:
+            self.assertTrue(game.make_move(current_space, move_space))
+        self.assertGreater(position.evaluate(BLUE), PIECE_VALUES[SOLDIER] - 50)
+        self.assertEqual(position.evaluate(RED), -position.evaluate(BLUE))
+        self.assertEqual(position.evaluate(BLUE), Board.from_rows(game.get_board()).evaluate(BLUE))
+        while game.get_move_history():
+            game.pop()
+        self.assertEqual(position.evaluate(BLUE), 0)
+
+    def test_best_move(self):
+        game = JanggiGame()
+        for current_space, move_space in MATE_MOVES[:-1]:
+            game.make_move(current_space, move_space)
+        start_hash = game.get_hash()
+        result = best_move(game, 5000, 3)
+        self.assertEqual(get_move_notation(result.get_move()), ("a3", "f3"))
+        self.assertGreater(result.get_score(), MATE_BOUND)
+        self.assertEqual(result.get_principal_variation()[0], result.get_move())
+        self.assertGreater(result.get_nodes(), 0)
+        self.assertEqual(game.get_hash(), start_hash)
+        self.assertEqual(len(game.get_move_history()), 10)
+        engine = JanggiEngine()
+        result = best_move(JanggiGame(), 50, engine=engine)
+        self.assertLess(result.get_seconds(), 1)
+        self.assertIn(result.get_move(), JanggiGame().get_legal_moves("blue"))
+        game = JanggiGame()
+        for current_space, move_space in [("c7", "c6"), ("c4", "c5")]:
+            game.make_move(current_space, move_space)
+        result = best_move(game, 10000, 1)
+        self.assertEqual(get_move_notation(result.get_move()), ("c6", "c5"))
+        result = best_move(JanggiGame(), 10000, 2, engine=engine)
+        self.assertEqual(result.get_depth(), 2)
+        self.assertGreaterEqual(len(result.get_principal_variation()), 2)
+        # Two Chariots down, red keeps the Generals facing each other and draws by bikjang
+        game = JanggiGame.from_fen("9/4K4/R8/9/9/9/9/9/4k4/R8 r")
+        result = best_move(game, 10000, 3)
+        self.assertEqual(result.get_score(), 0)
+        self.assertTrue(game.make_move(*get_move_notation(result.get_move())))
+        self.assertEqual(game.get_game_state(), "DRAW")
+
+    def test_pack(self):
+        game = JanggiGame()
+        for current_space, move_space in [("c7", "c6"), ("c4", "c5"), ("c6", "c5"), ("e2", "e2")]:
+            self.assertTrue(game.make_move(current_space, move_space))
+        packed = game.pack()
+        self.assertEqual(len(packed), 46)
+        copy = JanggiGame.from_packed(packed)
+        self.assertEqual(copy.get_hash(), game.get_hash())
+        self.assertEqual(copy.get_last_turn(), "red")
+        self.assertEqual((copy.get_item_from_board(2, 4).get_color(), copy.get_item_from_board(2, 4).get_type()),
+                         ("blue", "Soldier"))
+        self.assertEqual(copy.get_item_from_board(4, 1).get_name(), "RGen")
+        self.assertEqual(copy.get_legal_moves("blue"), game.get_legal_moves("blue"))
+        self.assertEqual(copy.get_move_history(), [])
+        self.assertRaises(ValueError, JanggiGame.from_packed, packed[:45])
+
+    def test_fen(self):
+        game = JanggiGame()
+        self.assertEqual(game.get_fen(), get_start_fen())
+        self.assertEqual(game.get_fen(), "RBNA1ABNR/4K4/1C5C1/P1P1P1P1P/9/9/p1p1p1p1p/1c5c1/4k4/rbna1abnr b UNFINISHED")
+        for current_space, move_space in [("c7", "c6"), ("c4", "c5"), ("c6", "c5"), ("e2", "e2")]:
+            game.make_move(current_space, move_space)
+        copy = JanggiGame.from_fen(game.get_fen())
+        self.assertEqual(copy.get_fen(), "RBNA1ABNR/4K4/1C5C1/P3P1P1P/9/2P6/p3p1p1p/1c5c1/4k4/rbna1abnr b UNFINISHED")
+        self.assertEqual(copy.get_hash(), game.get_hash())
+        self.assertEqual(copy.get_legal_moves("blue"), game.get_legal_moves("blue"))
+        self.assertTrue(copy.make_move("c5", "c4"))
+
+        game = JanggiGame.from_fen(get_start_fen("HEEH", "EHHE"))
+        self.assertEqual(game.get_item_from_board(1, 0).get_type(), "Horse")
+        self.assertEqual(game.get_item_from_board(2, 0).get_type(), "Elephant")
+        self.assertEqual(game.get_item_from_board(7, 9).get_type(), "Elephant")
+        self.assertEqual(game.get_item_from_board(6, 9).get_type(), "Horse")
+        self.assertEqual(game.get_last_turn(), "red")
+        self.assertEqual(JanggiGame.from_fen("4K4/9/9/9/9/9/9/9/4k4/9 r").get_last_turn(), "blue")
+        for fen in ("9/9/9/9/9/9/9/9/9/9 b UNFINISHED", "4k4/9/9/9/9/9/9/9/4K4/9 b UNFINISHED",
+                    "4K4/9/9/9/9/9/9/9/4k4/9 x UNFINISHED", "4K4/9/9/9/9/9/9/9/4k5/9", "4K4/9/9/9/9/9/9/9/4k3Q/9"):
+            self.assertRaises(ValueError, JanggiGame.from_fen, fen)
+        self.assertRaises(ValueError, get_start_fen, "EEHH")
+
+    def test_parallel_search(self):
+        table = SharedTranspositionTable(1024)
+        table.store(12345, (3, -250, 2, encode_move(1, 2)))
+        self.assertEqual(table.get(12345), (3, -250, 2, encode_move(1, 2)))
+        self.assertIsNone(table.get(12345 + 1024))
+        table.clear()
+        self.assertIsNone(table.get(12345))
+        game = JanggiGame()
+        for current_space, move_space in [("c7", "c6"), ("c4", "c5")]:
+            game.make_move(current_space, move_space)
+        for mode, slots in ((ROOT_SPLIT, 0), (LAZY_SMP, 1 << 16)):
+            engine = ParallelEngine(2, mode, slots)
+            try:
+                result = engine.search(game, 5000, 2)
+            finally:
+                engine.close()
+            self.assertEqual(get_move_notation(result.get_move()), ("c6", "c5"))
+            self.assertEqual(result.get_depth(), 2)
+            self.assertGreater(result.get_nodes(), 0)
+        engine = ParallelEngine(2, ROOT_SPLIT)
+        try:
+            result = engine.search(game, 0, 64)
+        finally:
+            engine.close()
+        self.assertIn(result.get_move(), game.get_legal_moves("blue"))
+
+    def test_reset(self):
+        game = JanggiGame()
+        start_hash = game.get_hash()
+        for current_space, move_space in [("c7", "c6"), ("c4", "c5"), ("c6", "c5")]:
+            game.make_move(current_space, move_space)
+        game.reset()
+        self.assertEqual(game.get_hash(), start_hash)
+        self.assertEqual(game.get_move_history(), [])
+        self.assertEqual(game.get_item_from_board(2, 3).get_name(), "RSo2")
+        self.assertEqual(len(game.get_legal_moves("blue")), 31)
+        self.assertTrue(game.make_move("c7", "c6"))
+        self.assertEqual(JanggiGame().get_item_from_board(2, 6).get_name(), "BSo2")
+
+    def test_validate_games(self):
+        games = [[("c7", "c6"), ("c4", "c5")], [("c7", "c6"), ("c1", "d4"), ("c4", "c5")], MATE_MOVES,
+                 MATE_MOVES + [("f1", "e2")], [("c7", "c6"), ("z1", "a1")], []]
+        expected = [(None, "UNFINISHED", 2), (1, "UNFINISHED", 1), (None, "BLUE_WON", 11), (11, "BLUE_WON", 11),
+                    (1, "UNFINISHED", 1), (None, "UNFINISHED", 0)]
+        for workers in (0, 2):
+            results = list(validate_games(iter(games), workers, chunk_size=2))
+            self.assertEqual([result.get_index() for result in results], list(range(len(games))))
+            self.assertEqual([(result.get_first_illegal_ply(), result.get_game_state(), result.get_plies_played())
+                              for result in results], expected)
+            self.assertEqual([result.is_legal() for result in results], [True, False, True, False, False, True])
+
+    def test_game_records(self):
+        game = JanggiGame()
+        for current_space, move_space in MATE_MOVES:
+            game.make_move(current_space, move_space)
+        records = [GameRecord.from_game(game, {"event": "test", "round": 1}),
+                   GameRecord([("c7", "c6"), ("e2", "e2")]), GameRecord([])]
+        self.assertEqual(records[0].get_result(), "BLUE_WON")
+        self.assertEqual(len(records[0].to_bytes()), 5 + len('{"event":"test","round":1}') + 2 * 11)
+        self.assertEqual(records[1].to_text(), "UNFINISHED\tc7-c6 e2-e2\t")
+
+        binary = io.BytesIO()
+        self.assertEqual(write_records(binary, iter(records)), 3)
+        binary.seek(0)
+        text = io.StringIO()
+        write_text_records(text, records)
+        text.seek(0)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.jgr")
+            with open(path, "wb") as file:
+                file.write(binary.getvalue())
+            for read in (list(read_records(binary)), list(read_text_records(text)), list(read_records_mmap(path))):
+                self.assertEqual([record.get_moves() for record in read], [record.get_moves() for record in records])
+                self.assertEqual([record.get_result() for record in read], ["BLUE_WON", "UNFINISHED", "UNFINISHED"])
+                self.assertEqual(read[0].get_metadata(), {"event": "test", "round": 1})
+        self.assertEqual(records[0].replay().get_game_state(), "BLUE_WON")
+        self.assertRaises(ValueError, GameRecord([("c1", "d3")]).replay)
+        self.assertRaises(ValueError, list, read_records(io.BytesIO(binary.getvalue()[:-1])))
+        for line in ("UNFINISHED\tc7\t", "UNFINISHED\tz9-c6\t", "UNFINISHED\tc7-c6\t{", "DONE\t\t"):
+            self.assertRaises(ValueError, GameRecord.from_text, line)
+
+    def test_opening_book(self):
+        records = [GameRecord([("c7", "c6"), ("c4", "c5"), ("c6", "c5")], "BLUE_WON"),
+                   GameRecord([("c7", "c6"), ("c4", "c5")], "RED_WON"),
+                   GameRecord([("c7", "c6"), ("a4", "a4")]),
+                   GameRecord([("g7", "g6"), ("c1", "d1")])]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.jgb")
+            self.assertEqual(build_book(records, path), 5)
+            book = OpeningBook(path)
+            try:
+                game = JanggiGame()
+                c7c6 = get_square(2, 6) | (get_square(2, 5) << 7)
+                g7g6 = get_square(6, 6) | (get_square(6, 5) << 7)
+                self.assertEqual(book.get_entries(game.get_hash()), [(c7c6, 3, 1), (g7g6, 1, 0)])
+                game.make_move("c7", "c6")
+                general = get_square(4, 1)
+                self.assertIn((general | (general << 7), 1, 0), book.get_entries(game.get_hash()))
+                game.make_move("c4", "c5")
+                self.assertEqual(get_move_notation(book.choose_move(game)), ("c6", "c5"))
+                self.assertEqual(get_move_captured(book.choose_move(game)), get_piece_code(RED, SOLDIER))
+                game.make_move("c6", "c5")
+                self.assertIsNone(book.choose_move(game))
+                self.assertEqual(book.get_entries(12345), [])
+            finally:
+                book.close()
+
+    def test_tablebase(self):
+        self.assertEqual(parse_material("KRka"), ((BLUE, CHARIOT), (RED, GUARD)))
+        self.assertRaises(ValueError, parse_material, "KRX")
+        with tempfile.TemporaryDirectory() as directory:
+            generate_tablebase("KRka", directory)
+            self.assertEqual(sorted(os.listdir(directory)), ["KRk.jtb", "KRka.jtb", "Kka.jtb"])
+            tablebases = TablebaseSet(directory)
+            try:
+                self.assertIsNone(tablebases.probe(JanggiGame()))
+                game = JanggiGame.from_fen("9/9/3K5/9/9/9/9/9/9/3kaR3 b")
+                self.assertEqual(tablebases.probe(game), (WIN, 1))
+                result = JanggiEngine(tablebases=tablebases).search(game, 2000, 2)
+                self.assertEqual(get_move_notation(result.get_move()), ("f1", "d3"))
+                game.make_move("f1", "d3")
+                self.assertEqual(game.get_game_state(), "BLUE_WON")
+                self.assertEqual(tablebases.probe(game), (LOSS, 0))
+                # The same position with the colors the other way round
+                self.assertEqual(tablebases.probe(JanggiGame.from_fen("3KAr3/9/9/9/9/9/9/3k5/9/9 r")), (WIN, 1))
+                self.assertEqual(tablebases.probe(JanggiGame.from_fen("9/9/3K5/9/9/9/9/9/9/3ka1R2 b")), (DRAW, 0))
+            finally:
+                tablebases.close()
+
+    def test_profiler(self):
+        make_move = JanggiGame.make_move
+        game = JanggiGame(LegalMoveCache())
+        with Profiler(slowest=2) as profiler:
+            self.assertRaises(RuntimeError, Profiler().enable)
+            for current_space, move_space in [("c7", "c6"), ("c4", "c5"), ("c6", "c7"), ("c6", "c5")]:
+                game.make_move(current_space, move_space)
+            game.get_legal_moves("red")
+            game.get_legal_moves("red")
+        self.assertIs(JanggiGame.make_move, make_move)
+        counters = profiler.get_counters()
+        self.assertEqual(counters["make_move"]["calls"], 4)
+        self.assertGreater(counters["calculate_attacks Soldier"]["calls"], 0)
+        self.assertGreater(counters["is_legal_move Horse"]["calls"], 0)
+        self.assertGreater(counters["generate_moves"]["calls"], 0)
+        self.assertEqual(counters["push (play move)"]["calls"], 3)
+        self.assertGreater(profiler.get_cache_counts()[0], 0)
+        slowest = profiler.get_slowest_moves()
+        self.assertEqual(len(slowest), 2)
+        self.assertGreaterEqual(slowest[0]["seconds"], slowest[1]["seconds"])
+        game.make_move("a7", "a6")
+        self.assertEqual(profiler.get_counters()["make_move"]["calls"], 4)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "profile.json")
+            profiler.dump(path)
+            with open(path) as file:
+                self.assertEqual(json.load(file)["counters"]["make_move"]["calls"], 4)
+        report = io.StringIO()
+        profiler.print_report(report)
+        self.assertIn("is_in_check", report.getvalue())
+
+    def test_import_has_no_output(self):
+        directory = os.path.dirname(os.path.abspath(__file__))
+        output = subprocess.run([sys.executable, "-c", "import JanggiGame"], cwd=directory, capture_output=True,
+                                text=True, check=True)
+        self.assertEqual(output.stdout, "")
+        output = subprocess.run([sys.executable, "JanggiGame.py"], cwd=directory, input="c7 c6\nc7 c8\nquit\n",
+                                capture_output=True, text=True, check=True)
+        self.assertIn("Illegal move", output.stdout)
+        self.assertEqual(output.stdout.count("BGen"), 2)
+
+    def test_pieces_are_shared(self):
+        first = JanggiGame()
+        second = JanggiGame.from_fen(first.get_fen())
+        self.assertIs(first.get_item_from_board(0, 0), second.get_item_from_board(0, 0))
+        self.assertIs(first.get_item_from_board(0, 0), get_piece(get_piece_code(RED, CHARIOT), 1))
+        self.assertEqual(get_piece(get_piece_code(BLUE, SOLDIER), 3).get_name(), "BSo3")
+        piece = first.get_item_from_board(4, 1)
+        self.assertRaises(AttributeError, setattr, piece, "_color", "blue")
+        self.assertFalse(hasattr(piece, "__dict__"))
+        self.assertEqual(Pieces.MAX_ROW, 9)
+
+    def test_server(self):
+        class FailingExecutor(ThreadPoolExecutor):
+            fail = False
+
+            def submit(self, *args, **kwargs):
+                if self.fail:
+                    raise RuntimeError("Executor failed")
+                return super().submit(*args, **kwargs)
+
+        executor = FailingExecutor(1)
+
+        async def run():
+            server = JanggiServer(executor)
+            port = await server.start()
+            player = await JanggiClient.connect(port=port)
+            watcher = await JanggiClient.connect(port=port)
+            try:
+                reply = await player.request("new")
+                session = reply["session"]
+                self.assertEqual(reply["fen"], JanggiGame().get_fen())
+                self.assertTrue((await watcher.request("subscribe", session=session))["ok"])
+                reply = await player.request("move", session=session, **{"from": "c4", "to": "c5"})
+                self.assertFalse(reply["legal"])
+                for current_space, move_space in MATE_MOVES[:-1]:
+                    reply = await player.request("move", session=session, **{"from": current_space, "to": move_space})
+                    self.assertTrue(reply["legal"])
+                # A failed checkmate test leaves the move unplayed
+                fen = reply["fen"]
+                executor.fail = True
+                reply = await player.request("move", session=session, **{"from": "a3", "to": "f3"})
+                self.assertFalse(reply["ok"])
+                reply = await player.request("get", session=session)
+                self.assertEqual((reply["fen"], reply["state"]), (fen, "UNFINISHED"))
+                executor.fail = False
+                reply = await player.request("move", session=session, **{"from": "a3", "to": "f3"})
+                self.assertTrue(reply["legal"])
+                self.assertEqual(reply["state"], "BLUE_WON")
+                self.assertEqual((await player.request("moves", session=session))["moves"], [])
+                event = await watcher.next_event()
+                self.assertEqual((event["from"], event["to"]), MATE_MOVES[0])
+                self.assertFalse((await player.request("get", session="none"))["ok"])
+                self.assertFalse((await player.request("new", fen=5))["ok"])
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(b"x" * (1 << 17) + b"\n")
+                self.assertFalse(json.loads(await reader.readline())["ok"])
+                self.assertEqual(await reader.read(), b"")
+                writer.close()
+                self.assertTrue((await player.request("close", session=session))["ok"])
+                self.assertEqual(server.get_session_count(), 0)
+                result = await run_load(port=port, clients=3, games=1, plies=6, idle=5)
+                self.assertEqual(result["requests"], 3 * (1 + 2 * 6))
+            finally:
+                await player.close()
+                await watcher.close()
+                await server.close()
+                executor.shutdown()
+
+        asyncio.run(run())
+
+    def test_clone(self):
+        game = JanggiGame()
+        game.make_move("c7", "c6")
+        clone = game.clone()
+        self.assertEqual(clone.get_fen(), game.get_fen())
+        self.assertEqual(clone.get_hash(), game.get_hash())
+        self.assertIs(clone.get_item_from_board(2, 5), game.get_item_from_board(2, 5))
+        # Moves in one game do not show in the other, whichever moves first
+        self.assertTrue(clone.make_move("c4", "c5"))
+        self.assertEqual(game.get_item_from_board(2, 4), "")
+        self.assertTrue(game.get_position().is_attacked(get_square(2, 4), BLUE))
+        self.assertFalse(clone.get_position().is_attacked(get_square(2, 3), BLUE))
+        self.assertTrue(game.make_move("a4", "b4"))
+        self.assertTrue(clone.get_position().is_attacked(get_square(1, 3), RED))
+        self.assertFalse(game.get_position().is_attacked(get_square(1, 3), RED))
+        clone.pop()
+        clone.pop()
+        self.assertEqual(clone.get_fen(), JanggiGame().get_fen())
+        self.assertEqual(copy.deepcopy(game).get_fen(), game.get_fen())
+        # Once its clones are gone a game changes its attack map without copying it
+        game = JanggiGame.from_fen(game.get_fen())
+        attack_counts = game._position._attack_counts
+        clone = game.clone()
+        del clone
+        self.assertTrue(game.make_move("a7", "a6"))
+        self.assertIs(game._position._attack_counts, attack_counts)
+        piece = game.get_item_from_board(0, 0)
+        self.assertIs(copy.deepcopy(piece), piece)
+        self.assertEqual(pickle.loads(pickle.dumps(piece)).get_name(), "RCh1")
+
+    def test_legal_moves_generator(self):
+        # Blue Cannon on e7 with nothing between it and the red General on e2: the red Chariot on d3 may not move
+        # onto the e file, where it would be the Cannon's screen, but may move along the d file
+        game = JanggiGame.from_fen("9/4K4/9/4C4/9/9/9/3r5/4k4/9 r")
+        moves = [get_move_notation(move) for move in game.legal_moves("red")]
+        self.assertNotIn(("d3", "e3"), moves)
+        self.assertIn(("d3", "d4"), moves)
+        # A red Horse between a blue Chariot and the red General can not move off the rank
+        game = JanggiGame.from_fen("9/4K4/9/9/9/9/9/9/R1n1k4/9 r")
+        self.assertEqual([move for move in game.get_legal_moves("red") if get_move_from(move) == get_square(2, 1)], [])
+        game = JanggiGame(LegalMoveCache(0))
+        generator = game.legal_moves("blue")
+        first = next(generator)
+        self.assertEqual(first, game.get_legal_moves("blue")[0])
+        self.assertEqual(len(list(generator)), 30)
+        generator = game.legal_moves("blue")
+        next(generator)
+        game.push(first)
+        self.assertRaises(RuntimeError, next, generator)
+
+    def test_repetition_and_bikjang(self):
+        game = JanggiGame()
+        for _ in range(2):
+            self.assertEqual(game.get_game_state(), "UNFINISHED")
+            self.assertTrue(game.make_move("e9", "e9"))
+            self.assertTrue(game.make_move("e2", "e2"))
+        self.assertEqual(game.get_repetition_count(), 3)
+        self.assertEqual(game.get_game_state(), "DRAW")
+        self.assertFalse(game.make_move("e9", "e9"))
+        self.assertEqual(JanggiGame.from_packed(game.pack()).get_game_state(), "DRAW")
+        self.assertEqual(JanggiGame.from_fen(game.get_fen()).get_game_state(), "DRAW")
+        game.pop()
+        self.assertEqual(game.get_game_state(), "UNFINISHED")
+        self.assertEqual(game.get_repetition_count(), 2)
 
+        # Blue opens the e file, red has to close it or the game is drawn
+        game = JanggiGame.from_fen("9/4K4/9/9/4P4/9/9/9/4k4/9 b")
+        self.assertFalse(game.is_bikjang())
+        self.assertTrue(game.make_move("e6", "d6"))
+        self.assertTrue(game.is_bikjang())
+        self.assertEqual(game.get_game_state(), "UNFINISHED")
+        clone = game.clone()
+        self.assertTrue(clone.make_move("e2", "d2"))
+        self.assertEqual(clone.get_game_state(), "UNFINISHED")
+        self.assertTrue(game.make_move("e2", "e1"))
+        self.assertEqual(game.get_game_state(), "DRAW")
 
 
 if __name__ == '__main__':